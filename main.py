@@ -33,3 +33,5 @@ print('\n[~] Successfully initialized Auto Maple')
 
 gui = GUI()
 gui.start()
+
+bot.prediction_client.close()
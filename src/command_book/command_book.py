@@ -125,3 +125,4 @@ class CommandBook(Configurable):
     def _set_keybinds(self):
         for k, v in self.config.items():
             setattr(self.module.Key, k, v)
+        components.clear_resolved_keys()
@@ -6,16 +6,13 @@ import os
 
 SESSION_FILE = os.path.join('.settings', 'session.json')
 
+# Last parsed session file, reused by load() until the file's modification time changes
+_cache = {'mtime': None, 'data': {}}
+
 
 def save(command_book_path=None, routine_path=None, minimap_path=None):
     """Update and save session. Pass only paths you want to update; others are preserved."""
-    data = {}
-    if os.path.isfile(SESSION_FILE):
-        try:
-            with open(SESSION_FILE, 'r') as f:
-                data = json.load(f)
-        except (json.JSONDecodeError, OSError):
-            pass
+    data = load()
 
     if command_book_path is not None:
         data['command_book'] = command_book_path
@@ -27,14 +24,22 @@ def save(command_book_path=None, routine_path=None, minimap_path=None):
     os.makedirs(os.path.dirname(SESSION_FILE), exist_ok=True)
     with open(SESSION_FILE, 'w') as f:
         json.dump(data, f, indent=2)
+    _cache['mtime'] = os.stat(SESSION_FILE).st_mtime_ns
+    _cache['data'] = data.copy()
 
 
 def load():
     """Load saved session paths. Returns dict with keys command_book, routine, minimap (or empty string if missing)."""
-    if not os.path.isfile(SESSION_FILE):
-        return {}
     try:
-        with open(SESSION_FILE, 'r') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, OSError):
+        mtime = os.stat(SESSION_FILE).st_mtime_ns
+    except OSError:
         return {}
+    if mtime != _cache['mtime']:
+        try:
+            with open(SESSION_FILE, 'r') as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            return {}
+        _cache['mtime'] = mtime
+        _cache['data'] = data
+    return _cache['data'].copy()
@@ -9,7 +9,12 @@ import numpy as np
 from src.common import config, settings
 from src.common.vkeys import press
 from src.common.decorators import run_if_enabled, run_if_disabled
-from random import random
+
+
+# Uniform [0, 1) samples drawn from NumPy in batches and consumed by bernoulli and rand_float
+_RNG = np.random.default_rng()
+_UNIFORM_BATCH = 4096
+_uniforms = []
 
 
 def distance(a, b):
@@ -50,60 +55,386 @@ def _frame_to_gray(frame):
     if frame.ndim == 2:
         return frame
     if frame.ndim == 3 and frame.shape[2] == 4:
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+        return cv2.cvtColor(frame, cv2.COLOR_BGRA2GRAY)
     return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
 
 
-def single_match(frame, template):
+def _cuda_available():
+    """Returns whether OpenCV was built with CUDA and can see at least one device."""
+
+    try:
+        return cv2.cuda.getCudaEnabledDeviceCount() > 0
+    except (AttributeError, cv2.error):
+        return False
+
+
+USE_CUDA = _cuda_available()
+
+
+def _opencl_available():
+    """Returns whether OpenCV can run OpenCL kernels on a GPU (including integrated ones)."""
+
+    try:
+        return cv2.ocl.haveOpenCL() and cv2.ocl.Device.getDefault().type() & cv2.ocl.Device_TYPE_GPU != 0
+    except (AttributeError, cv2.error):
+        return False
+
+
+# OpenCL (through cv2.UMat) is only used for matching when CUDA is not
+USE_OPENCL = not USE_CUDA and _opencl_available()
+
+# Images smaller than this many pixels are matched on the CPU even when a GPU is available.
+# Uploading them and downloading the result takes longer than the match itself, which only
+# leaves the notifier's half-window message searches (~525,000 pixels at 1366x768) on the GPU.
+GPU_MIN_AREA = 250_000
+
+# Per-thread GPU frame buffer and matchers, plus templates kept resident on the GPU.
+# Template entries hold the source array so a recycled id() is never mistaken for it.
+_gpu_local = threading.local()
+_gpu_templates = {}
+
+
+def _gpu_template(template):
+    """
+    Returns TEMPLATE as a cv2.cuda_GpuMat, or as a cv2.UMat for OpenCL, uploading it only
+    the first time it is seen.
+    """
+
+    cached = _gpu_templates.get(id(template))
+    if cached is None or cached[0] is not template:
+        if USE_CUDA:
+            gpu = cv2.cuda_GpuMat()
+            gpu.upload(template)
+        else:
+            gpu = cv2.UMat(template)
+        cached = (template, gpu)
+        _gpu_templates[id(template)] = cached
+    return cached[1]
+
+
+def _use_gpu(gray, template):
+    """Returns whether matching TEMPLATE against GRAY should run on the GPU."""
+
+    return ((USE_CUDA or USE_OPENCL) and gray.size >= GPU_MIN_AREA
+            and gray.dtype == np.uint8 and template.dtype == np.uint8)
+
+
+def _gpu_match(gray, template, method):
+    """
+    Runs template matching with cv2.cuda or OpenCL and returns the correlation map still on
+    the GPU, as a cv2.cuda_GpuMat or a cv2.UMat respectively.
+    """
+
+    local = _gpu_local
+    if getattr(local, 'source', None) is not gray:
+        if USE_CUDA:
+            if not hasattr(local, 'frame'):
+                local.frame = cv2.cuda_GpuMat()
+            local.frame.upload(gray)
+        else:
+            local.frame = cv2.UMat(gray)
+        local.source = gray
+    if not USE_CUDA:
+        return cv2.matchTemplate(local.frame, _gpu_template(template), method)
+    if not hasattr(local, 'matchers'):
+        local.matchers = {}
+        local.results = {}
+    matcher = local.matchers.get(method)
+    if matcher is None:
+        matcher = cv2.cuda.createTemplateMatching(cv2.CV_8U, method)
+        local.matchers[method] = matcher
+    # Correlation maps are written into a buffer kept per method and template size, which is
+    # only reallocated when the frame size changes. Callers read each map before the next match.
+    key = (method, template.shape)
+    result = local.results.get(key)
+    if result is None:
+        result = cv2.cuda_GpuMat()
+        local.results[key] = result
+    return matcher.match(local.frame, _gpu_template(template), result)
+
+
+def match_template(gray, template, method=cv2.TM_CCOEFF_NORMED):
+    """
+    Same as cv2.matchTemplate, but runs on the GPU when CUDA or OpenCL is available.
+    Consecutive calls with the same GRAY array only upload it once, so GRAY must not be
+    modified in place between them.
+    :param gray:        The grayscale image in which to search.
+    :param template:    The grayscale template to match with.
+    :param method:      The cv2.matchTemplate method to use.
+    :return:            The correlation map as a NumPy array.
+    """
+
+    if not _use_gpu(gray, template):
+        return cv2.matchTemplate(gray, template, method)
+    result = _gpu_match(gray, template, method)
+    return result.download() if USE_CUDA else result.get()
+
+
+def match_template_peak(gray, template, method=cv2.TM_CCOEFF_NORMED):
+    """
+    Same as match_template, but only returns the highest score and where it is. On the GPU
+    the peak is found on the device, so the correlation map is never downloaded.
+    :param gray:        The grayscale image in which to search.
+    :param template:    The grayscale template to match with.
+    :param method:      The cv2.matchTemplate method to use.
+    :return:            The highest score and the (x, y) top-left position that reached it.
+    """
+
+    if _use_gpu(gray, template):
+        result = _gpu_match(gray, template, method)
+        _, max_val, _, max_loc = cv2.cuda.minMaxLoc(result) if USE_CUDA else cv2.minMaxLoc(result)
+        return float(max_val), (int(max_loc[0]), int(max_loc[1]))
+    result = cv2.matchTemplate(gray, template, method)
+    # argmax only looks for the maximum, unlike cv2.minMaxLoc which also finds the minimum
+    y, x = np.unravel_index(int(result.argmax()), result.shape)
+    return float(result[y, x]), (int(x), int(y))
+
+
+def prepare_frame(frame):
+    """
+    Converts FRAME to grayscale once so it can be shared by several template matches.
+    Pass the result to multi_match_gray, or to single_match via its GRAY keyword.
+    :param frame:   A BGR, BGRA or grayscale image.
+    :return:        The grayscale version of FRAME (FRAME itself if already grayscale).
+    """
+
+    return _frame_to_gray(frame)
+
+
+def single_match(frame, template, gray=None):
     """
     Finds the best match within FRAME.
     :param frame:       The image in which to search for TEMPLATE.
     :param template:    The template to match with.
+    :param gray:        FRAME already converted by prepare_frame, skips the conversion if given.
     :return:            The top-left and bottom-right positions of the best match.
     """
-    gray = _frame_to_gray(frame)
-    result = cv2.matchTemplate(gray, template, cv2.TM_CCOEFF)
-    _, _, _, top_left = cv2.minMaxLoc(result)
+    if gray is None:
+        gray = _frame_to_gray(frame)
+    _, top_left = match_template_peak(gray, template, cv2.TM_CCOEFF)
     w, h = template.shape[::-1]
     bottom_right = (top_left[0] + w, top_left[1] + h)
     return top_left, bottom_right
 
 
-def multi_match(frame, template, threshold=0.95):
+def single_match_score(gray, template, threshold=None):
+    """
+    Finds the best match for TEMPLATE in GRAY and how well it matches. Cheaper than
+    multi_match_gray for templates that can appear at most once, since no threshold mask
+    or list of matches is built. If THRESHOLD is given and no GPU is available, GRAY is searched
+    coarse-to-fine and only regions that could reach THRESHOLD are scored at full resolution,
+    so scores well below THRESHOLD may come back as -1.
+    :param gray:        The grayscale image in which to search (2D array).
+    :param template:    The template to match with (must be grayscale).
+    :param threshold:   The score the caller is interested in, enables the pyramid search.
+    :return:            The best TM_CCOEFF_NORMED score (-1 if TEMPLATE does not fit in GRAY)
+                        and the center of that match (None if it does not fit).
+    """
+
+    if template.shape[0] > gray.shape[0] or template.shape[1] > gray.shape[1]:
+        return -1.0, None
+    h, w = template.shape[:2]
+    if threshold is None or _use_gpu(gray, template):
+        # A full search on the GPU is cheaper than a pyramid search on the CPU
+        score, (x, y) = match_template_peak(gray, template)
+    else:
+        tmpl_pyr = _scaled_template_pyramid(template, 1.0, w, h)
+        frame_pyr = _gray_pyramid(gray)
+        levels = 1
+        while (levels < min(len(tmpl_pyr), len(frame_pyr))
+               and tmpl_pyr[levels].shape[0] <= frame_pyr[levels].shape[0]
+               and tmpl_pyr[levels].shape[1] <= frame_pyr[levels].shape[1]):
+            levels += 1
+        result = _pyramid_match(frame_pyr[:levels], tmpl_pyr[:levels], threshold)
+        y, x = np.unravel_index(int(result.argmax()), result.shape)
+        score = float(result[y, x])
+    return score, (int(round(x + w / 2)), int(round(y + h / 2)))
+
+
+def multi_match(frame, template, threshold=0.95, peaks_only=False, method=cv2.TM_CCOEFF_NORMED):
     """
     Finds all matches in FRAME that are similar to TEMPLATE by at least THRESHOLD.
     :param frame:       The image in which to search.
     :param template:    The template to match with.
     :param threshold:   The minimum percentage of TEMPLATE that each result must match.
+    :param peaks_only:  Whether to collapse each cluster of neighbouring hits into its best match.
+    :param method:      The normalized cv2.matchTemplate method to score matches with.
     :return:            An array of matches that exceed THRESHOLD.
     """
 
     if template.shape[0] > frame.shape[0] or template.shape[1] > frame.shape[1]:
         return []
     gray = _frame_to_gray(frame)
-    return multi_match_gray(gray, template, threshold)
+    return multi_match_gray(gray, template, threshold, peaks_only=peaks_only, method=method)
 
 
-def multi_match_gray(gray, template, threshold=0.95):
+def multi_match_gray(gray, template, threshold=0.95, peaks_only=False, method=cv2.TM_CCOEFF_NORMED):
     """
     Finds all matches in GRAY (grayscale image) that are similar to TEMPLATE by at least THRESHOLD.
     Use this when you already have a grayscale image to avoid redundant conversions.
+    TM_SQDIFF_NORMED is somewhat cheaper than the default TM_CCOEFF_NORMED, but its scores
+    (taken as 1 - difference) are not interchangeable with correlation thresholds.
     :param gray:        The grayscale image in which to search (2D array).
     :param template:    The template to match with (must be grayscale).
     :param threshold:   The minimum percentage of TEMPLATE that each result must match.
+    :param peaks_only:  Whether to collapse each cluster of neighbouring hits into its best match.
+    :param method:      The normalized cv2.matchTemplate method to score matches with.
     :return:            An array of matches that exceed THRESHOLD.
     """
     if template.shape[0] > gray.shape[0] or template.shape[1] > gray.shape[1]:
         return []
-    result = cv2.matchTemplate(gray, template, cv2.TM_CCOEFF_NORMED)
-    locations = np.where(result >= threshold)
-    locations = list(zip(*locations[::-1]))
-    results = []
-    for p in locations:
-        x = int(round(p[0] + template.shape[1] / 2))
-        y = int(round(p[1] + template.shape[0] / 2))
-        results.append((x, y))
-    return results
+    result = match_template(gray, template, method)
+    if method == cv2.TM_SQDIFF_NORMED:
+        result = cv2.subtract(1.0, result)      # Lower difference means a better match
+    return _match_centers(result, template.shape[1], template.shape[0], threshold, peaks_only)
+
+
+def _match_centers(result, w, h, threshold, peaks_only=False):
+    """
+    Converts the positions in the correlation map RESULT that reach THRESHOLD into the
+    centers of the W x H matched regions. If PEAKS_ONLY is True, only positions that are
+    the maximum of their W x H neighbourhood are kept.
+    """
+
+    mask = result >= threshold
+    if peaks_only:
+        mask &= result >= cv2.dilate(result, np.ones((h, w), np.uint8))
+    ys, xs = np.nonzero(mask)
+    cx = np.rint(xs + w / 2).astype(int)
+    cy = np.rint(ys + h / 2).astype(int)
+    return list(zip(cx.tolist(), cy.tolist()))
+
+
+# Number of times the frame is halved for coarse-to-fine matching
+PYRAMID_LEVELS = 2
+
+# Templates are not downsampled below this many pixels on their shorter side
+PYRAMID_MIN_TEMPLATE = 8
+
+# Coarse-level correlation (relative to THRESHOLD) needed to refine a region
+PYRAMID_COARSE_RATIO = 0.7
+
+# Padding (in pixels) added around each candidate region when refining it
+PYRAMID_PADDING = 2
+
+_PYRAMID_CLOSE_KERNEL = np.ones((3, 3), np.uint8)
+
+# The image pyramid last built by _gray_pyramid on each thread, with the array it was built from
+_pyramid_local = threading.local()
+
+
+def _gray_pyramid(gray):
+    """
+    Returns GRAY followed by PYRAMID_LEVELS pyrDown levels. Consecutive calls with the same
+    array reuse the pyramid, so GRAY must not be modified in place between them.
+    """
+
+    local = _pyramid_local
+    if getattr(local, 'source', None) is not gray:
+        pyr = [gray]
+        for _ in range(PYRAMID_LEVELS):
+            pyr.append(cv2.pyrDown(pyr[-1]))
+        local.source = gray
+        local.pyr = pyr
+    return local.pyr
+
+
+# Resized template pyramids keyed by (id(template), scale, width, height). Each entry also
+# holds the original template so a recycled id is never mistaken for a cached one.
+_TEMPLATE_SCALE_CACHE = {}
+_TEMPLATE_SCALE_CACHE_SIZE = 64
+
+
+def _scaled_template_pyramid(template, s, w, h):
+    """
+    Returns TEMPLATE resized to W x H (scale S) followed by its pyrDown levels, reusing
+    the result of earlier calls since templates do not change after they are loaded.
+    """
+
+    key = (id(template), s, w, h)
+    cached = _TEMPLATE_SCALE_CACHE.get(key)
+    if cached is not None and cached[0] is template:
+        return cached[1]
+    resized = cv2.resize(
+        template, (w, h),
+        interpolation=cv2.INTER_AREA if s < 1 else cv2.INTER_LINEAR,
+    )
+    tmpl_pyr = [resized]
+    while len(tmpl_pyr) <= PYRAMID_LEVELS and min(tmpl_pyr[-1].shape[:2]) >= 2 * PYRAMID_MIN_TEMPLATE:
+        tmpl_pyr.append(cv2.pyrDown(tmpl_pyr[-1]))
+    if len(_TEMPLATE_SCALE_CACHE) >= _TEMPLATE_SCALE_CACHE_SIZE:
+        _TEMPLATE_SCALE_CACHE.clear()
+    _TEMPLATE_SCALE_CACHE[key] = (template, tmpl_pyr)
+    return tmpl_pyr
+
+
+def _pyramid_match(frame_pyr, tmpl_pyr, threshold):
+    """
+    Coarse-to-fine equivalent of cv2.matchTemplate with TM_CCOEFF_NORMED. Matches at the
+    coarsest usable level of FRAME_PYR, then only re-matches the regions around promising
+    candidates at each finer level.
+    :param frame_pyr:   List of grayscale images, each half the size of the previous one.
+    :param tmpl_pyr:    The template sized for FRAME_PYR[0], followed by its pyrDown levels.
+    :param threshold:   The correlation that final matches must reach.
+    :return:            A correlation map for FRAME_PYR[0]; unexplored positions are -1.
+    """
+
+    # TM_CCOEFF_NORMED builds its own integral images on every call, but only of the coarse
+    # level and the candidate windows; normalizing TM_CCORR with shared integrals in NumPy is slower
+    top = min(len(frame_pyr), len(tmpl_pyr)) - 1
+    result = cv2.matchTemplate(frame_pyr[top], tmpl_pyr[top], cv2.TM_CCOEFF_NORMED)
+    for level in range(top - 1, -1, -1):
+        candidates = (result >= threshold * PYRAMID_COARSE_RATIO).astype(np.uint8)
+        candidates = cv2.morphologyEx(candidates, cv2.MORPH_CLOSE, _PYRAMID_CLOSE_KERNEL)
+        gray, tmpl = frame_pyr[level], tmpl_pyr[level]
+        th, tw = tmpl.shape[:2]
+        rh, rw = gray.shape[0] - th + 1, gray.shape[1] - tw + 1
+        refined = np.full((rh, rw), -1, dtype=np.float32)
+        _, _, stats, _ = cv2.connectedComponentsWithStats(candidates)
+        for x, y, w, h, _ in stats[1:]:
+            x0 = max(0, 2 * x - PYRAMID_PADDING)
+            y0 = max(0, 2 * y - PYRAMID_PADDING)
+            x1 = min(rw, 2 * (x + w) + PYRAMID_PADDING)
+            y1 = min(rh, 2 * (y + h) + PYRAMID_PADDING)
+            if x1 <= x0 or y1 <= y0:
+                continue
+            window = gray[y0:y1 + th - 1, x0:x1 + tw - 1]
+            refined[y0:y1, x0:x1] = cv2.matchTemplate(window, tmpl, cv2.TM_CCOEFF_NORMED)
+        result = refined
+    return result
+
+
+def multi_match_pyramid(frame, template, threshold=0.95):
+    """
+    Same as multi_match, but searches a downsampled copy of FRAME first and only re-matches
+    the regions around promising candidates at full resolution.
+    :param frame:       The image in which to search.
+    :param template:    The template to match with (must be grayscale).
+    :param threshold:   The minimum percentage of TEMPLATE that each result must match.
+    :return:            An array of matches that exceed THRESHOLD.
+    """
+
+    if template.shape[0] > frame.shape[0] or template.shape[1] > frame.shape[1]:
+        return []
+    gray = _frame_to_gray(frame)
+    th, tw = template.shape[:2]
+    tmpl_pyr = _scaled_template_pyramid(template, 1.0, tw, th)
+    frame_pyr = [gray]
+    while len(frame_pyr) < len(tmpl_pyr):
+        down = cv2.pyrDown(frame_pyr[-1])
+        t_h, t_w = tmpl_pyr[len(frame_pyr)].shape[:2]
+        if t_h > down.shape[0] or t_w > down.shape[1]:
+            break
+        frame_pyr.append(down)
+    result = _pyramid_match(frame_pyr, tmpl_pyr, threshold)
+    return _match_centers(result, tw, th, threshold)
+
+
+# How far above THRESHOLD a scale must score for multi_match_multiscale to stop early
+MULTISCALE_EARLY_EXIT_MARGIN = 0.03
+
+# The last scale that produced a match for each template, keyed like _TEMPLATE_SCALE_CACHE
+_last_scales = {}
 
 
 def multi_match_multiscale(
@@ -116,49 +447,50 @@ def multi_match_multiscale(
     Same as multi_match but tries the template at several scales so the same
     icon at a different resolution/size still matches (scale-invariant).
     Picks the scale with the best correlation, then returns all matches at that
-    scale above THRESHOLD.
+    scale above THRESHOLD. Each scale is searched coarse-to-fine on an image pyramid.
     :param frame:     BGR or grayscale image to search in.
     :param template:  Grayscale template (e.g. from cv2.imread(..., 0)).
     :param threshold: Minimum correlation to count as a match.
     :param scales:    Tuple of scale factors to try (1.0 = original size).
     :return:          List of (x, y) center positions, same format as multi_match.
     """
-    if frame.ndim == 3:
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    else:
-        gray = frame
+    gray = _frame_to_gray(frame)
+    frame_pyr = [gray]
+    for _ in range(PYRAMID_LEVELS):
+        frame_pyr.append(cv2.pyrDown(frame_pyr[-1]))
     th, tw = template.shape[:2]
     best_scale = 1.0
     best_result = None
     best_max_val = -1.0
 
-    for s in scales:
+    # Try the scale that won last time for this template (or 1.0) first, and stop as soon
+    # as a scale clears THRESHOLD by a comfortable margin
+    cached = _last_scales.get(id(template))
+    likely = cached[1] if cached is not None and cached[0] is template else 1.0
+    good_enough = min(0.99, threshold + MULTISCALE_EARLY_EXIT_MARGIN)
+    for s in sorted(scales, key=lambda x: x != likely):
         w = max(1, int(round(tw * s)))
         h = max(1, int(round(th * s)))
         if h > gray.shape[0] or w > gray.shape[1]:
             continue
-        resized = cv2.resize(
-            template, (w, h),
-            interpolation=cv2.INTER_AREA if s < 1 else cv2.INTER_LINEAR,
-        )
-        result = cv2.matchTemplate(gray, resized, cv2.TM_CCOEFF_NORMED)
+        tmpl_pyr = _scaled_template_pyramid(template, s, w, h)
+        result = _pyramid_match(frame_pyr, tmpl_pyr, threshold)
         min_val, max_val, _, _ = cv2.minMaxLoc(result)
         if max_val > best_max_val:
             best_max_val = max_val
             best_scale = s
             best_result = result
             best_w, best_h = w, h
+        if max_val >= good_enough:
+            break
 
     if best_result is None:
         return []
-    locations = np.where(best_result >= threshold)
-    locations = list(zip(*locations[::-1]))
-    results = []
-    for p in locations:
-        x = int(round(p[0] + best_w / 2))
-        y = int(round(p[1] + best_h / 2))
-        results.append((x, y))
-    return results
+    if best_max_val >= threshold:
+        if len(_last_scales) >= _TEMPLATE_SCALE_CACHE_SIZE:
+            _last_scales.clear()
+        _last_scales[id(template)] = (template, best_scale)
+    return _match_centers(best_result, best_w, best_h, threshold)
 
 
 def convert_to_relative(point, frame):
@@ -181,25 +513,114 @@ def convert_to_absolute(point, frame):
     return x, y
 
 
+def convert_all_to_absolute(points, frame):
+    """
+    Vectorized convert_to_absolute: converts every (x, y) in POINTS (0-1 relative) into
+    pixel coordinates based on FRAME, rounding the same way.
+    :param points:  A sequence of relative (x, y) points.
+    :param frame:   The image whose width and height the points are relative to.
+    :return:        An (N, 2) int32 array of pixel coordinates.
+    """
+
+    arr = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    return np.rint(arr * (frame.shape[1], frame.shape[0])).astype(np.int32)
+
+
+# BGR bounding box of every color that falls within a given tuple of HSV ranges
+_BGR_BOUNDS_CACHE = {}
+
+
+def _bgr_bounds(ranges):
+    """
+    Returns the smallest BGR box containing every color that passes the HSV RANGES. Each
+    combination of BGR values is converted once, one blue value at a time, so the box is exact.
+    :param ranges:  A tuple of tuples, each of which is a pair upper and lower HSV bounds.
+    :return:        The lower and upper BGR bounds, or None if no color passes RANGES.
+    """
+
+    bounds = _BGR_BOUNDS_CACHE.get(ranges)
+    if bounds is None:
+        plane = np.empty((256, 256, 3), np.uint8)
+        plane[..., 1], plane[..., 2] = np.mgrid[0:256, 0:256]
+        lower = upper = None
+        mask = np.empty((256, 256), np.uint8)
+        for b in range(256):
+            plane[..., 0] = b
+            hsv = cv2.cvtColor(plane, cv2.COLOR_BGR2HSV)
+            mask[:] = 0
+            for low, high in ranges:
+                cv2.bitwise_or(mask, cv2.inRange(hsv, low, high), dst=mask)
+            g, r = np.nonzero(mask)
+            if len(g):
+                if lower is None:
+                    lower, upper = [b, g.min(), r.min()], [b, g.max(), r.max()]
+                else:
+                    lower = [lower[0], min(lower[1], g.min()), min(lower[2], r.min())]
+                    upper = [b, max(upper[1], g.max()), max(upper[2], r.max())]
+        if lower is not None:
+            bounds = (tuple(int(v) for v in lower), tuple(int(v) for v in upper))
+        _BGR_BOUNDS_CACHE[ranges] = bounds or ()
+    return bounds or None
+
+
 def filter_color(img, ranges):
     """
     Returns a filtered copy of IMG that only contains pixels within the given RANGES.
-    on the HSV scale.
+    on the HSV scale. RANGES must be a tuple so that its BGR bounds can be cached.
     :param img:     The image to filter.
-    :param ranges:  A list of tuples, each of which is a pair upper and lower HSV bounds.
+    :param ranges:  A tuple of tuples, each of which is a pair upper and lower HSV bounds.
     :return:        A filtered copy of IMG.
     """
 
+    # Most frames have no pixel that could pass RANGES, which a BGR inRange finds without
+    # converting IMG to HSV
+    bounds = _bgr_bounds(ranges)
+    if bounds is None:
+        return np.zeros_like(img)
+    lower, upper = bounds
+    if img.ndim == 3 and img.shape[2] == 4:
+        # Let any alpha through, so BGRA captures are checked without a BGR copy
+        lower, upper = lower + (0,), upper + (255,)
+    if not cv2.countNonZero(cv2.inRange(img, lower, upper)):
+        return np.zeros_like(img)
+
     hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
     mask = cv2.inRange(hsv, ranges[0][0], ranges[0][1])
-    for i in range(1, len(ranges)):
-        mask = cv2.bitwise_or(mask, cv2.inRange(hsv, ranges[i][0], ranges[i][1]))
+    if len(ranges) > 1:
+        # Reuse one scratch mask for the remaining ranges and OR each into MASK in place
+        tmp = np.empty_like(mask)
+        for i in range(1, len(ranges)):
+            cv2.inRange(hsv, ranges[i][0], ranges[i][1], dst=tmp)
+            cv2.bitwise_or(mask, tmp, dst=mask)
 
     # Mask the image
-    color_mask = mask > 0
-    result = np.zeros_like(img, np.uint8)
-    result[color_mask] = img[color_mask]
-    return result
+    return cv2.bitwise_and(img, img, mask=mask)
+
+
+# Number of bands mostly_dark scans before each check for an early exit
+DARK_SCAN_BANDS = 8
+
+
+def mostly_dark(gray, ratio, level=15):
+    """
+    Returns whether more than RATIO of the pixels in GRAY are darker than LEVEL. GRAY is
+    counted one band of rows at a time, stopping as soon as enough bright pixels have been
+    seen to rule it out, so frames that are clearly not dark only read their first band.
+    :param gray:    The grayscale image to check.
+    :param ratio:   The fraction of pixels that must be dark.
+    :param level:   Pixels below this intensity are dark.
+    :return:        Whether GRAY is mostly dark.
+    """
+
+    height, width = gray.shape[:2]
+    step = max(1, -(-height // DARK_SCAN_BANDS))
+    bright = 0
+    for top in range(0, height, step):
+        _, band = cv2.threshold(gray[top:top + step], level - 1, 255, cv2.THRESH_BINARY)
+        bright += cv2.countNonZero(band)
+        if (height * width - bright) / height / width <= ratio:
+            return False
+    return True
 
 
 def draw_location(minimap, pos, color):
@@ -244,8 +665,19 @@ def closest_point(points, target):
     """
 
     if points:
-        points.sort(key=lambda p: distance(p, target))
-        return points[0]
+        arr = np.asarray(points, dtype=np.float64)
+        d2 = (arr[:, 0] - target[0]) ** 2 + (arr[:, 1] - target[1]) ** 2
+        return points[int(d2.argmin())]
+
+
+def _random():
+    """Returns the next uniform sample in [0, 1), refilling the batch when it runs out."""
+
+    try:
+        return _uniforms.pop()
+    except IndexError:
+        _uniforms.extend(_RNG.random(_UNIFORM_BATCH).tolist())
+        return _uniforms.pop()
 
 
 def bernoulli(p):
@@ -255,14 +687,14 @@ def bernoulli(p):
     :return:    True or False.
     """
 
-    return random() < p
+    return _random() < p
 
 
 def rand_float(start, end):
     """Returns a random float value in the interval [START, END)."""
 
     assert start < end, 'START must be less than END'
-    return (end - start) * random() + start
+    return (end - start) * _random() + start
 
 
 ##########################
@@ -280,13 +712,23 @@ class Async(threading.Thread):
         self.function(*self.args, **self.kwargs)
         self.queue.put('x')
 
-    def process_queue(self, root):
-        def f():
-            try:
-                self.queue.get_nowait()
-            except queue.Empty:
-                root.after(100, self.process_queue(root))
-        return f
+
+# Async tasks started by the GUI that have not finished yet, polled by a single ticker
+_pending_tasks = set()
+_POLL_INTERVAL = 50       # Milliseconds between polls of the pending tasks
+
+
+def _poll_tasks(root):
+    """Removes finished tasks from the pending set; reschedules itself while any remain."""
+
+    for task in list(_pending_tasks):
+        try:
+            task.queue.get_nowait()
+            _pending_tasks.discard(task)
+        except queue.Empty:
+            pass
+    if _pending_tasks:
+        root.after(_POLL_INTERVAL, _poll_tasks, root)
 
 
 def enter_cash_shop(repeat: int = 10):
@@ -317,5 +759,7 @@ def async_callback(context, function, *args, **kwargs):
     def f():
         task = Async(function, *args, **kwargs)
         task.start()
-        context.after(100, task.process_queue(context))
+        if not _pending_tasks:
+            context.after(_POLL_INTERVAL, _poll_tasks, context)
+        _pending_tasks.add(task)
     return f
@@ -4,6 +4,7 @@ import ctypes
 import time
 import win32con
 import win32api
+from src.common import config
 from src.common.decorators import run_if_enabled
 from ctypes import wintypes
 from random import random
@@ -216,10 +217,20 @@ def press(key, n, down_time=0.05, up_time=0.1):
     :return:            None
     """
 
+    key = key.lower()
+    if key not in KEY_MAP.keys():
+        print(f"Invalid keyboard input: '{key}'.")
+        return
+
+    # Build the key-down and key-up inputs once instead of on every key_down and key_up call
+    down = Input(type=INPUT_KEYBOARD, ki=KeyboardInput(wVk=KEY_MAP[key]))
+    up = Input(type=INPUT_KEYBOARD, ki=KeyboardInput(wVk=KEY_MAP[key], dwFlags=KEYEVENTF_KEYUP))
+    size = ctypes.sizeof(down)
     for _ in range(n):
-        key_down(key)
+        if config.enabled:      # Like key_down, only the key-down can be cancelled
+            user32.SendInput(1, ctypes.byref(down), size)
         time.sleep(down_time * (0.8 + 0.4 * random()))
-        key_up(key)
+        user32.SendInput(1, ctypes.byref(up), size)
         time.sleep(up_time * (0.8 + 0.4 * random()))
 
 
@@ -1,7 +1,10 @@
 import asyncio
 import base64
+import functools
+import importlib.util
 import io
 import os
+import cv2
 import numpy as np
 import httpx
 from PIL import Image
@@ -9,14 +12,29 @@ from urllib.parse import urlparse
 
 from dotenv import load_dotenv
 
+# Optional libjpeg-turbo bindings (pip install PyTurboJPEG); falls back to OpenCV's encoder
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR, TJPF_BGRA
+    _TJ = TurboJPEG()
+except Exception:
+    _TJ = None
+
 # Load environment variables from .env (use .env.example as template)
 load_dotenv()
 
 
-def crop_to_640x640(img: Image.Image, vertical_offset: int = 50) -> Image.Image:
-    CROP_SIZE = 640
-    width, height = img.size
+CROP_SIZE = 640
+JPEG_QUALITY = 95
+
+# HTTP/2 needs the optional h2 package (pip install httpx[http2]); fall back to HTTP/1.1 without it
+HTTP2 = importlib.util.find_spec("h2") is not None
 
+# Every request goes to the same host, so a few kept-alive connections are plenty
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=4, max_connections=4)
+HTTP_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+
+
+def _crop_box(width: int, height: int, vertical_offset: int = 50) -> tuple[int, int, int, int]:
     left = (width - CROP_SIZE) // 2
     right = left + CROP_SIZE
 
@@ -31,7 +49,11 @@ def crop_to_640x640(img: Image.Image, vertical_offset: int = 50) -> Image.Image:
         right = width
         left = max(0, width - CROP_SIZE)
 
-    img_cropped = img.crop((left, top, right, bottom))
+    return left, top, right, bottom
+
+
+def crop_to_640x640(img: Image.Image, vertical_offset: int = 50) -> Image.Image:
+    img_cropped = img.crop(_crop_box(*img.size, vertical_offset=vertical_offset))
 
     if img_cropped.size != (CROP_SIZE, CROP_SIZE):
         img_cropped = img_cropped.resize((CROP_SIZE, CROP_SIZE), Image.Resampling.LANCZOS)
@@ -40,17 +62,42 @@ def crop_to_640x640(img: Image.Image, vertical_offset: int = 50) -> Image.Image:
 
 
 def _frame_to_base64_jpeg(frame: np.ndarray, vertical_offset: int = 50) -> str:
-    if frame.shape[2] == 4:
-        rgb = frame[..., :3][..., ::-1].copy()
-    else:
-        rgb = frame[..., ::-1].copy()
-    img = Image.fromarray(rgb)
-    img_cropped = crop_to_640x640(img, vertical_offset=vertical_offset)
-    if img_cropped.mode != "RGB":
+    # Crop and encode the BGR(A) frame directly with OpenCV; no PIL round-trip or channel
+    # conversion, since the JPEG encoder takes BGR and drops the alpha channel of BGRA itself
+    height, width = frame.shape[:2]
+    left, top, right, bottom = _crop_box(width, height, vertical_offset=vertical_offset)
+    cropped = frame[top:bottom, left:right]
+    if cropped.shape[:2] != (CROP_SIZE, CROP_SIZE):
+        cropped = cv2.resize(cropped, (CROP_SIZE, CROP_SIZE), interpolation=cv2.INTER_LANCZOS4)
+    return base64.b64encode(_encode_jpeg(cropped)).decode("utf-8")
+
+
+def _encode_jpeg(image: np.ndarray) -> bytes:
+    if _TJ is not None:
+        pixel_format = TJPF_BGRA if image.ndim == 3 and image.shape[2] == 4 else TJPF_BGR
+        return _TJ.encode(np.ascontiguousarray(image), quality=JPEG_QUALITY, pixel_format=pixel_format)
+    ok, buf = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+    if not ok:
+        raise ValueError("Could not encode frame as JPEG")
+    return buf.tobytes()
+
+
+@functools.lru_cache(maxsize=8)
+def _image_file_to_base64_jpeg(image_path: str, mtime_ns: int, vertical_offset: int = 50) -> str:
+    # MTIME_NS is part of the cache key so a file rewritten in place is decoded again
+    with Image.open(image_path) as img:
+        img_cropped = crop_to_640x640(img, vertical_offset=vertical_offset)
+
+    if img_cropped.mode == "RGBA":
+        rgb_img = Image.new("RGB", img_cropped.size, (255, 255, 255))
+        rgb_img.paste(img_cropped, mask=img_cropped.split()[3])
+        img_cropped = rgb_img
+    elif img_cropped.mode != "RGB":
         img_cropped = img_cropped.convert("RGB")
-    buf = io.BytesIO()
-    img_cropped.save(buf, format="JPEG", quality=95)
-    return base64.b64encode(buf.getvalue()).decode("utf-8")
+
+    img_bytes = io.BytesIO()
+    img_cropped.save(img_bytes, format="JPEG", quality=JPEG_QUALITY)
+    return base64.b64encode(img_bytes.getvalue()).decode("utf-8")
 
 
 def _get_env_config() -> tuple[str, str]:
@@ -68,6 +115,12 @@ def _get_env_config() -> tuple[str, str]:
 class ArrowPredictionClient:
     def __init__(self):
         self.api_url, self.proxy_secret = _get_env_config()
+        # Headers required by RapidAPI: x-rapidapi-key and x-rapidapi-host
+        self.headers = {
+            "Content-Type": "application/json",
+            "x-rapidapi-host": urlparse(self.api_url).netloc,
+            "x-rapidapi-key": self.proxy_secret,
+        }
         self.loop = None
         self.client = None
 
@@ -79,40 +132,38 @@ class ArrowPredictionClient:
 
     async def _get_client(self):
         if self.client is None:
-            self.client = httpx.AsyncClient(timeout=30.0)
+            self.client = httpx.AsyncClient(http2=HTTP2, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
         return self.client
 
-    def _request_headers(self) -> dict:
-        """Headers required by RapidAPI: x-rapidapi-key and x-rapidapi-host."""
-        host = urlparse(self.api_url).netloc
-        return {
-            "Content-Type": "application/json",
-            "x-rapidapi-host": host,
-            "x-rapidapi-key": self.proxy_secret,
-        }
+    async def _close_async(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def close(self):
+        """Closes the pooled HTTP connections and the client's event loop."""
+
+        if self.loop is None or self.loop.is_closed() or self.loop.is_running():
+            return
+        try:
+            self.loop.run_until_complete(self._close_async())
+        except Exception as e:
+            print(f"[Rune solver] Failed to close client: {e}")
+        finally:
+            self.loop.close()
 
     async def _predict_async(self, image_path: str, vertical_offset: int = 50) -> list[str] | None:
         if not os.path.exists(image_path):
             raise FileNotFoundError(f"Image not found: {image_path}")
         try:
-            img = Image.open(image_path)
-            img_cropped = crop_to_640x640(img, vertical_offset=vertical_offset)
-
-            if img_cropped.mode == "RGBA":
-                rgb_img = Image.new("RGB", img_cropped.size, (255, 255, 255))
-                rgb_img.paste(img_cropped, mask=img_cropped.split()[3])
-                img_cropped = rgb_img
-            elif img_cropped.mode != "RGB":
-                img_cropped = img_cropped.convert("RGB")
-
-            img_bytes = io.BytesIO()
-            img_cropped.save(img_bytes, format="JPEG", quality=95)
-            image_base64 = base64.b64encode(img_bytes.getvalue()).decode("utf-8")
+            image_base64 = _image_file_to_base64_jpeg(
+                image_path, os.stat(image_path).st_mtime_ns, vertical_offset=vertical_offset
+            )
 
             client = await self._get_client()
             payload = {"image": image_base64}
             response = await client.post(
-                self.api_url, json=payload, headers=self._request_headers()
+                self.api_url, json=payload, headers=self.headers
             )
 
             if response.status_code == 200:
@@ -136,7 +187,7 @@ class ArrowPredictionClient:
             client = await self._get_client()
             payload = {"image": image_base64}
             response = await client.post(
-                self.api_url, json=payload, headers=self._request_headers()
+                self.api_url, json=payload, headers=self.headers
             )
             if response.status_code == 200:
                 data = response.json()
@@ -2,7 +2,7 @@ import cv2
 import tkinter as tk
 from PIL import ImageTk, Image
 from src.gui.interfaces import LabelFrame
-from src.common import config, utils
+from src.common import config, settings, utils
 from src.routine.components import Point
 
 
@@ -20,6 +20,11 @@ class Minimap(LabelFrame):
         # Reuse a single PhotoImage and update with paste() to avoid Tk/PIL memory leak
         # when repeatedly calling canvas.itemconfig(image=...) with new PhotoImages.
         self._photo = None
+        # Letterboxed canvas-sized image that each frame's minimap is pasted into
+        self._canvas_img = Image.new('RGB', (self.WIDTH, self.HEIGHT), (0, 0, 0))
+        self._last_rect = None
+        # Everything the last rendered frame depended on; unchanged frames are skipped
+        self._last_key = None
 
     def display_minimap(self):
         """Updates the Main page with the current minimap."""
@@ -33,6 +38,16 @@ class Minimap(LabelFrame):
         path = minimap['path']
         player_pos = minimap['player_pos']
 
+        # Skip the frame if neither the minimap nor anything drawn on top of it has changed
+        raw = minimap['minimap']
+        points = tuple(p.location for p in config.routine.sequence if isinstance(p, Point))
+        key = (hash(raw.tobytes()), raw.shape, rune_active, rune_pos,
+               tuple(path) if config.enabled else None, player_pos,
+               config.enabled, points, settings.move_tolerance, id(config.layout))
+        if key == self._last_key:
+            return
+        self._last_key = key
+
         img = cv2.cvtColor(minimap['minimap'], cv2.COLOR_BGR2RGB)
         height, width, _ = img.shape
 
@@ -54,17 +69,14 @@ class Minimap(LabelFrame):
 
         # Draw the current path that the program is taking
         if config.enabled and len(path) > 1:
-            for i in range(len(path) - 1):
-                start = utils.convert_to_absolute(path[i], img)
-                end = utils.convert_to_absolute(path[i + 1], img)
-                cv2.line(img, start, end, (0, 255, 255), 1)
+            cv2.polylines(img, [utils.convert_all_to_absolute(path, img)], False, (0, 255, 255), 1)
 
         # Draw each Point in the routine as a circle
-        for p in config.routine.sequence:
-            if isinstance(p, Point):
-                utils.draw_location(img,
-                                    p.location,
-                                    (0, 255, 0) if config.enabled else (255, 0, 0))
+        if points:
+            radius = round(img.shape[1] * settings.move_tolerance)
+            color = (0, 255, 0) if config.enabled else (255, 0, 0)
+            for center in utils.convert_all_to_absolute(points, img).tolist():
+                cv2.circle(img, tuple(center), radius, color, 1)
 
         # Display the current Layout
         if config.layout:
@@ -81,20 +93,23 @@ class Minimap(LabelFrame):
         # from creating a new PhotoImage every frame (Tk/PIL leak on itemconfig).
         try:
             pil_img = Image.fromarray(img)
-            # Create full-size black background and paste minimap centered (letterbox).
-            # The PIL Image (~360KB) is small compared to frames, so recreating is fine.
-            full = Image.new('RGB', (self.WIDTH, self.HEIGHT), (0, 0, 0))
+            # Paste minimap centered (letterbox) into the persistent black canvas,
+            # clearing the previous minimap's area first if its size changed.
             x = (self.WIDTH - new_width) // 2
             y = (self.HEIGHT - new_height) // 2
-            full.paste(pil_img, (x, y))
-            
+            rect = (x, y, x + new_width, y + new_height)
+            if self._last_rect is not None and rect != self._last_rect:
+                self._canvas_img.paste((0, 0, 0), self._last_rect)
+            self._canvas_img.paste(pil_img, (x, y))
+            self._last_rect = rect
+
             if self._photo is None:
-                self._photo = ImageTk.PhotoImage(image=full)
+                self._photo = ImageTk.PhotoImage(image=self._canvas_img)
                 self.container = self.canvas.create_image(
                     self.WIDTH // 2, self.HEIGHT // 2, image=self._photo, anchor=tk.CENTER
                 )
             else:
-                self._photo.paste(full)
+                self._photo.paste(self._canvas_img)
         except MemoryError:
             # If allocation fails, skip this frame update (next frame will retry).
             pass
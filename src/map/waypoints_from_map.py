@@ -6,6 +6,7 @@ If waypoints appear shifted (e.g. 50px too low), the map image may have a border
 in-game minimap doesn't. Use crop_top/crop_bottom/crop_left/crop_right (pixels), or
 generate corrected waypoints with graph_waypoints.py and save as *_waypoints.json.
 """
+import functools
 import json
 import os
 import re
@@ -19,6 +20,13 @@ except ImportError:
     pytesseract = None
     _PYTESSERACT_IMPORTED = False
 
+# Optional in-process Tesseract binding; avoids starting a tesseract process per OCR call
+try:
+    import tesserocr
+    from PIL import Image
+except ImportError:
+    tesserocr = None
+
 def load_map_image_for_match(path, background_bgr=(0, 0, 0)):
     """
     Load a map PNG and composite onto a solid background so transparent (checkered) areas
@@ -33,12 +41,10 @@ def load_map_image_for_match(path, background_bgr=(0, 0, 0)):
         return img
     if img.ndim == 3 and img.shape[2] == 4:
         # Composite onto solid background: transparent -> background color
-        b, g, r, a = cv2.split(img)
-        a = a.astype(np.float32) / 255.0
-        bg = np.array(background_bgr, dtype=np.float32)
-        out = np.zeros_like(img[:, :, :3], dtype=np.float32)
-        for c in range(3):
-            out[:, :, c] = a * img[:, :, c].astype(np.float32) + (1 - a) * bg[c]
+        a = img[:, :, 3:4].astype(np.float32) / 255.0
+        bg = np.array(background_bgr, dtype=np.float32).reshape(1, 1, 3)
+        out = a * img[:, :, :3]
+        out += (1 - a) * bg
         return out.astype(np.uint8)
     return img
 
@@ -49,6 +55,7 @@ ERODE_SIZE = 2  # Reduced from 3 to preserve platform detection
 MIN_PLATFORM_AREA = 30
 MIN_ASPECT_RATIO = 2.0  # Platforms must be at least 2x wider than tall
 PLATFORM_SHIFT_UP = 10  # Shift the lowest 3 waypoints up by this many pixels
+ERODE_KERNEL = cv2.getStructuringElement(cv2.MORPH_RECT, (ERODE_SIZE, ERODE_SIZE))
 
 
 def waypoints_from_map_image(
@@ -78,8 +85,9 @@ def waypoints_from_map_image(
         img = img[:, :, :3]
     gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
     _, binary = cv2.threshold(gray, BG_THRESHOLD, 255, cv2.THRESH_BINARY)
-    kernel = np.ones((ERODE_SIZE, ERODE_SIZE), np.uint8)
-    eroded = cv2.erode(binary, kernel)
+    eroded = cv2.erode(binary, ERODE_KERNEL)
+    # Keep OpenCV's default labeling algorithm: Wu/SAUF finds the same blobs on the bundled maps but
+    # numbers them differently (which reorders the waypoints) and is no faster at minimap sizes
     num_labels, labels, stats, centroids = cv2.connectedComponentsWithStats(eroded)
     h_img, w_img = gray.shape[:2]
     
@@ -90,90 +98,64 @@ def waypoints_from_map_image(
         w_content, h_content = w_img, h_img
         crop_left = crop_right = crop_top = crop_bottom = 0
     
-    # First pass: collect all valid platforms with aspect ratio filtering
-    valid_platforms = []
-    for i in range(1, num_labels):
-        area = stats[i, cv2.CC_STAT_AREA]
-        width = stats[i, cv2.CC_STAT_WIDTH]
-        height = stats[i, cv2.CC_STAT_HEIGHT]
-        x = stats[i, cv2.CC_STAT_LEFT]
-        y = stats[i, cv2.CC_STAT_TOP]
-        
-        # Filter by area
-        if area < MIN_PLATFORM_AREA:
-            continue
-        
-        # Calculate aspect ratio and filter
-        aspect_ratio = width / height if height > 0 else 0
-        if aspect_ratio < MIN_ASPECT_RATIO:
-            continue
-        
-        cx, cy = centroids[i]
-        valid_platforms.append({
-            'index': i,
-            'cx': cx,
-            'cy': cy,
-            'x': x,
-            'y': y,
-            'width': width,
-            'height': height,
-            'area': area,
-        })
+    # First pass: select valid platforms by area and aspect ratio over the whole stats array
+    # (multiplicative form of width / height >= MIN_ASPECT_RATIO, so no division by zero)
+    areas = stats[1:, cv2.CC_STAT_AREA]
+    widths = stats[1:, cv2.CC_STAT_WIDTH]
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    valid = (areas >= MIN_PLATFORM_AREA) & (heights > 0) & (widths >= MIN_ASPECT_RATIO * heights)
+    valid_idx = np.nonzero(valid)[0] + 1
+    platform_cx = centroids[valid_idx, 0]
+    platform_cy = centroids[valid_idx, 1]
+    platform_x = stats[valid_idx, cv2.CC_STAT_LEFT]
+    platform_width = stats[valid_idx, cv2.CC_STAT_WIDTH]
     
     # Find the bottom-most platform (highest y-coordinate)
-    bottom_platform_index = None
-    if valid_platforms:
-        bottom_platform = max(valid_platforms, key=lambda p: p['cy'])
-        bottom_platform_index = bottom_platform['index']
+    bottom_platform = int(np.argmax(platform_cy)) if len(valid_idx) else None
     
-    # Second pass: generate waypoints (unshifted); we'll shift only the lowest 3
-    waypoints_raw = []
-    for platform in valid_platforms:
-        i = platform['index']
-        cx = platform['cx']
-        cy = platform['cy']
-        x = platform['x']
-        width = platform['width']
-        
-        if i == bottom_platform_index:
-            # Bottom platform: 3 points at 1/4, 1/2, and 3/4 of width
-            positions = [0.25, 0.5, 0.75]
-            for pos_fraction in positions:
-                px = x + width * pos_fraction
-                py = cy
-                waypoints_raw.append({
-                    "px": px, "py": py,
-                    "is_bottom_platform": True
-                })
-        else:
-            # Regular platform: single center point
-            px = cx
-            py = cy
-            waypoints_raw.append({
-                "px": px, "py": py,
-                "is_bottom_platform": False
-            })
+    # Second pass: generate waypoints (unshifted) as parallel arrays; we'll shift only the lowest 3.
+    # Every platform contributes its center, except the bottom platform which contributes
+    # 3 points at 1/4, 1/2, and 3/4 of its width, kept in the platform's place in the order.
+    counts = np.ones(len(valid_idx), dtype=np.intp)
+    if bottom_platform is not None:
+        counts[bottom_platform] = 3
+    px = np.repeat(platform_cx, counts)
+    py = np.repeat(platform_cy, counts)
+    is_bottom = np.zeros(len(px), dtype=bool)
+    if bottom_platform is not None:
+        # Every platform before it has one waypoint, so its 3 start at its own index
+        span = slice(bottom_platform, bottom_platform + 3)
+        x = platform_x[bottom_platform]
+        width = platform_width[bottom_platform]
+        px[span] = x + width * np.array([0.25, 0.5, 0.75])
+        is_bottom[span] = True
     
-    # Find indices of the 3 waypoints with highest y (lowest on map); only those get shifted up
-    indices_to_shift = sorted(
-        range(len(waypoints_raw)),
-        key=lambda idx: waypoints_raw[idx]["py"],
-        reverse=True
-    )[:3]
-    for idx in indices_to_shift:
-        waypoints_raw[idx]["py"] -= PLATFORM_SHIFT_UP
+    # Find indices of the 3 waypoints with highest y (lowest on map); only those get shifted up.
+    # Selection instead of a full sort; ties at the cutoff go to the earliest waypoints.
+    n_shift = min(3, len(py))
+    if n_shift:
+        cutoff = np.partition(py, len(py) - n_shift)[len(py) - n_shift]
+        above = np.flatnonzero(py > cutoff)
+        ties = np.flatnonzero(py == cutoff)[:n_shift - len(above)]
+        py[np.concatenate((above, ties))] -= PLATFORM_SHIFT_UP
     
-    # Normalize to 0-1 relative to content region (preserve original waypoint order)
-    waypoints = []
-    for w in waypoints_raw:
-        x_rel = (w["px"] - crop_left) / w_content
-        y_rel = (w["py"] - crop_top) / h_content
-        waypoints.append({
-            "x": round(x_rel, 4),
-            "y": round(y_rel, 4),
-            "is_bottom_platform": w["is_bottom_platform"]
-        })
-    return waypoints
+    # Normalize to 0-1 relative to content region (preserve original waypoint order), in place
+    for coords, offset, extent in ((px, crop_left, w_content), (py, crop_top, h_content)):
+        coords -= offset
+        coords /= extent
+        np.round(coords, 4, out=coords)
+    return [
+        {"x": x, "y": y, "is_bottom_platform": b}
+        for x, y, b in zip(px.tolist(), py.tolist(), is_bottom.tolist())
+    ]
+
+
+def _mtime(path):
+    """Modification time of PATH in nanoseconds, or None if it does not exist."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
 
 
 def waypoints_from_map_path(map_path):
@@ -182,18 +164,30 @@ def waypoints_from_map_path(map_path):
     alongside the map (same base name), load that instead of recomputing.
     If a *_crop.json exists with e.g. {"crop_top": 50}, those pixels are excluded
     when computing waypoints (so borders don't shift points).
+    Results are cached until the map or either JSON file changes on disk.
     :param map_path: path to map PNG
     :return: list of {"x": float, "y": float} in 0-1
     """
     base, _ = os.path.splitext(map_path)
-    json_path = base + "_waypoints.json"
-    if os.path.exists(json_path):
-        with open(json_path, "r") as f:
+    waypoints = _waypoints_from_map_path(
+        map_path,
+        _mtime(map_path),
+        _mtime(base + "_waypoints.json"),
+        _mtime(base + "_crop.json"),
+    )
+    return [dict(w) for w in waypoints]
+
+
+@functools.lru_cache(maxsize=64)
+def _waypoints_from_map_path(map_path, map_mtime, waypoints_mtime, crop_mtime):
+    """Uncached body of waypoints_from_map_path; the mtimes (None if missing) key the cache."""
+    base, _ = os.path.splitext(map_path)
+    if waypoints_mtime is not None:
+        with open(base + "_waypoints.json", "r") as f:
             return json.load(f)
     crop = {}
-    crop_path = base + "_crop.json"
-    if os.path.exists(crop_path):
-        with open(crop_path, "r") as f:
+    if crop_mtime is not None:
+        with open(base + "_crop.json", "r") as f:
             crop = json.load(f)
     # Composite transparent PNGs onto black so platform detection matches game minimap
     img = load_map_image_for_match(map_path)
@@ -214,12 +208,45 @@ def waypoints_from_map_path(map_path):
 _OCR_ROI_WIDTH_FRAC = 0.40
 _OCR_ROI_HEIGHT_FRAC = 0.20
 _OCR_MATCH_MIN_SCORE = 0.5  # minimum score to accept OCR match (word overlap / containment)
+_OCR_TARGET_SHORT_SIDE = 200  # ROI is shrunk by whole factors until its shorter side is about this
 # Default Windows Tesseract path when not on PATH (fail gracefully if missing)
 _TESSERACT_CMD_WINDOWS = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+# The map name is in the minimap's title bar, the top of the OCR region; the live minimap below it
+# is left out of the fingerprint, which is this band shrunk and coarsely quantized
+_OCR_NAME_BAND_HEIGHT_FRAC = 0.05
+_OCR_FINGERPRINT_SIZE = (128, 16)
+_OCR_FINGERPRINT_SHIFT = 3
+# Fingerprint of the last OCR'd map name and the asset it matched, so an unchanged name skips Tesseract
+_last_ocr_match = {'key': None, 'path': None}
+# Patterns used by _normalize_for_match
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9\s]")
+_WS_RE = re.compile(r"\s+")
+
+
+# Reused tesserocr API: {'api': PyTessBaseAPI or None, 'failed': True once creating it has failed}
+_tesserocr = {'api': None, 'failed': False}
+
+
+def _tesserocr_api():
+    """Shared tesserocr API, created on first use. None if tesserocr is missing or fails to load."""
+    if tesserocr is None or _tesserocr['failed']:
+        return None
+    if _tesserocr['api'] is None:
+        tessdata = os.path.join(os.path.dirname(_TESSERACT_CMD_WINDOWS), "tessdata")
+        try:
+            if os.name == "nt" and os.path.isdir(tessdata):
+                _tesserocr['api'] = tesserocr.PyTessBaseAPI(path=tessdata + os.sep)
+            else:
+                _tesserocr['api'] = tesserocr.PyTessBaseAPI()
+        except Exception:
+            _tesserocr['failed'] = True
+    return _tesserocr['api']
 
 
 def _is_ocr_available():
-    """True if pytesseract is installed and Tesseract executable is usable. Fails gracefully."""
+    """True if tesserocr or pytesseract (with a usable Tesseract executable) can run. Fails gracefully."""
+    if _tesserocr_api() is not None:
+        return True
     if not _PYTESSERACT_IMPORTED:
         return False
     try:
@@ -244,8 +271,8 @@ def _normalize_for_match(text):
     if not text:
         return ""
     text = text.lower().strip()
-    text = re.sub(r"[^a-z0-9\s]", "", text)
-    text = re.sub(r"\s+", " ", text)
+    text = _NON_ALNUM_RE.sub("", text)
+    text = _WS_RE.sub(" ", text)
     return text.strip()
 
 
@@ -258,11 +285,61 @@ def _read_text_from_roi_ocr(image, roi_rect):
             return ""
         if len(img.shape) == 3:
             img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        # Tesseract's runtime scales with pixel count; on large frames the map name stays legible smaller
+        scale = max(1, min(img.shape[:2]) // _OCR_TARGET_SHORT_SIDE)
+        if scale > 1:
+            img = cv2.resize(img, None, fx=1 / scale, fy=1 / scale, interpolation=cv2.INTER_AREA)
+        api = _tesserocr_api()
+        if api is not None:
+            api.SetImage(Image.fromarray(img))
+            return api.GetUTF8Text().strip()
         return pytesseract.image_to_string(img).strip()
     except Exception:
         return ""
 
 
+# Per-directory asset names: minimaps_dir -> (dir mtime, assets); see _minimap_assets
+_ASSET_CACHE = {}
+
+
+def _minimap_assets(minimaps_dir):
+    """
+    Return the PNG assets in MINIMAPS_DIR as a dict of parallel columns: 'paths' and 'names'
+    (normalized map names), longest name first (ties by filename) so the most specific
+    containment match is seen first, and 'n_words' (distinct words per name, as an array).
+    'word_index' maps each word to an array of the indices of the assets whose names contain it.
+    Reused until the directory's mtime changes (asset added/removed/renamed).
+    """
+    mtime = _mtime(minimaps_dir)
+    cached = _ASSET_CACHE.get(minimaps_dir)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    entries = []
+    for name in sorted(os.listdir(minimaps_dir)):
+        if not name.lower().endswith(".png"):
+            continue
+        norm_map = _normalize_for_match(_asset_filename_to_map_name(name))
+        if not norm_map:
+            continue
+        entries.append((os.path.join(minimaps_dir, name), norm_map))
+    entries.sort(key=lambda entry: -len(entry[1]))
+    word_index = {}
+    n_words = np.zeros(len(entries), dtype=np.float64)
+    for i, (_, norm_map) in enumerate(entries):
+        map_words = frozenset(norm_map.split())
+        for word in map_words:
+            word_index.setdefault(word, []).append(i)
+        n_words[i] = len(map_words)
+    assets = {
+        'paths': [path for path, _ in entries],
+        'names': [norm_map for _, norm_map in entries],
+        'n_words': n_words,
+        'word_index': {word: np.array(indices, dtype=np.intp) for word, indices in word_index.items()},
+    }
+    _ASSET_CACHE[minimaps_dir] = (mtime, assets)
+    return assets
+
+
 def _best_matching_asset_ocr(ocr_text, minimaps_dir):
     """
     Compare OCR text to each asset's derived map name; return (best_path, best_score).
@@ -271,31 +348,32 @@ def _best_matching_asset_ocr(ocr_text, minimaps_dir):
     norm_ocr = _normalize_for_match(ocr_text)
     if not norm_ocr or not os.path.isdir(minimaps_dir):
         return None, 0.0
-    best_path = None
-    best_score = 0.0
-    for name in sorted(os.listdir(minimaps_dir)):
-        if not name.lower().endswith(".png"):
-            continue
-        path = os.path.join(minimaps_dir, name)
-        map_name = _asset_filename_to_map_name(name)
-        norm_map = _normalize_for_match(map_name)
-        if not norm_map:
-            continue
+    assets = _minimap_assets(minimaps_dir)
+    names = assets['names']
+    if not names:
+        return None, 0.0
+
+    # A whole map name inside the OCR text is a perfect match; the OCR text inside a map name is next best
+    ocr_in_map = np.zeros(len(names), dtype=bool)
+    for i, norm_map in enumerate(names):
         if norm_map in norm_ocr:
-            score = 1.0
-        elif norm_ocr in norm_map:
-            score = 0.95
-        else:
-            ocr_words = set(norm_ocr.split())
-            map_words = set(norm_map.split())
-            if not map_words:
-                continue
-            overlap = len(ocr_words & map_words) / len(map_words)
-            score = overlap if overlap >= 0.5 else overlap * 0.5
-        if score > best_score:
-            best_score = score
-            best_path = path
-    return best_path, best_score
+            return assets['paths'][i], 1.0
+        ocr_in_map[i] = norm_ocr in norm_map
+
+    # Otherwise score every asset at once by the fraction of its words found in the OCR text
+    shared = np.zeros(len(names), dtype=np.float64)
+    for word in frozenset(norm_ocr.split()):
+        indices = assets['word_index'].get(word)
+        if indices is not None:
+            shared[indices] += 1
+    overlap = shared / assets['n_words']
+    scores = np.where(overlap >= 0.5, overlap, overlap * 0.5)
+    scores[ocr_in_map] = 0.95
+
+    best = int(np.argmax(scores))
+    if scores[best] <= 0:
+        return None, 0.0
+    return assets['paths'][best], float(scores[best])
 
 
 def find_matching_map(game_minimap_or_frame, minimaps_dir, threshold=0.7, scales=(0.25, 0.35, 0.5, 0.7, 0.85, 1.0, 1.2)):
@@ -318,13 +396,21 @@ def find_matching_map(game_minimap_or_frame, minimaps_dir, threshold=0.7, scales
         return None
     if min(h, w) <= 400:
         return None  # Need full frame for OCR region
-    if not _is_ocr_available():
-        return None
     roi_w = int(w * _OCR_ROI_WIDTH_FRAC)
     roi_h = int(h * _OCR_ROI_HEIGHT_FRAC)
+    name_band = game_minimap_or_frame[:max(1, int(h * _OCR_NAME_BAND_HEIGHT_FRAC)), :roi_w]
+    fingerprint = cv2.resize(name_band, _OCR_FINGERPRINT_SIZE, interpolation=cv2.INTER_AREA)
+    fingerprint >>= _OCR_FINGERPRINT_SHIFT
+    key = (hash(fingerprint.tobytes()), fingerprint.shape, minimaps_dir, _mtime(minimaps_dir))
+    if key == _last_ocr_match['key']:
+        return _last_ocr_match['path']
+    if not _is_ocr_available():
+        return None
     roi_rect = (0, 0, roi_w, roi_h)
     ocr_text = _read_text_from_roi_ocr(game_minimap_or_frame, roi_rect)
     best_path, best_score = _best_matching_asset_ocr(ocr_text, minimaps_dir)
-    if best_path is not None and best_score >= _OCR_MATCH_MIN_SCORE:
-        return best_path
-    return None
+    if best_path is None or best_score < _OCR_MATCH_MIN_SCORE:
+        best_path = None
+    _last_ocr_match['key'] = key
+    _last_ocr_match['path'] = best_path
+    return best_path
@@ -1,11 +1,11 @@
 """An interpreter that reads and executes user-created routines."""
 
 import os
-import re
 import threading
 import time
 import git
 import cv2
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
 from src.common import config, settings, utils
 from src.detection.detection import ArrowPredictionClient, crop_to_640x640
@@ -48,7 +48,12 @@ class Bot(Configurable):
         self.rune_closest_pos = (0, 0)      # Location of the Point closest to rune
         self.submodules = []
         self.command_book = None            # CommandBook instance
+        self.move_command = None            # The command book's 'move' and 'adjust' commands
+        self.adjust_command = None
         self.prediction_client = ArrowPredictionClient()
+        self.last_failed_num = None         # Highest failed detection image number, scanned once
+        self.matcher = ThreadPoolExecutor(max_workers=1)    # Template matching off the bot thread
+        self.wake_event = threading.Event()                 # Set to wake the idle main loop early
 
         config.routine = Routine()
 
@@ -126,7 +131,9 @@ class Bot(Configurable):
                 element.execute()
                 config.routine.step()
             else:
-                time.sleep(0.01)
+                # Idle until something wakes the loop (e.g. enabling it), re-checking at least every 0.5s
+                self.wake_event.wait(timeout=0.5)
+                self.wake_event.clear()
 
     @utils.run_if_enabled
     def _solve_rune(self):
@@ -137,12 +144,10 @@ class Bot(Configurable):
         """
         global attempts
         print("attempt: ", str(attempts))
-        move = self.command_book['move']
-        move(*self.rune_pos).execute()
-        adjust = self.command_book['adjust']
-        adjust(*self.rune_pos).execute()
+        self.move_command(*self.rune_pos).execute()
+        self.adjust_command(*self.rune_pos).execute()
         time.sleep(0.4)
-        adjust(*self.rune_pos).execute()
+        self.adjust_command(*self.rune_pos).execute()
         time.sleep(0.4)
         press(self.config['Interact'], 1, down_time=0.2)        # Inherited from Configurable
 
@@ -161,21 +166,17 @@ class Bot(Configurable):
                 for arrow in solution:
                     press(arrow, 1, down_time=0.1)
                 time.sleep(1)
+                # Each frame is matched in the background while waiting for the next one to render
+                pending = []
                 for _ in range(3):
                     time.sleep(0.3)
                     frame = config.capture.frame
-                    rune_buff = utils.multi_match(frame[:frame.shape[0] // 8, :],
-                                                 RUNE_BUFF_TEMPLATE,
-                                                 threshold=0.7)
-                    if rune_buff:
-                        rune_buff_pos = min(rune_buff, key=lambda p: p[0])
-                        target = (
-                            round(rune_buff_pos[0] + config.capture.window['left']),
-                            round(rune_buff_pos[1] + config.capture.window['top'])
-                        )
-                        click(target, button='right')
-                        attempts = 0
-                        solution_found = True
+                    # Slicing whole rows keeps the band a C-contiguous view, so matching copies nothing
+                    top_band = frame[:frame.shape[0] // 8]
+                    pending.append(self.matcher.submit(self._click_rune_buff, top_band))
+                if any([future.result() for future in pending]):
+                    attempts = 0
+                    solution_found = True
                 self.rune_active = False
                 break
         if not solution_found and frame is not None:
@@ -192,18 +193,43 @@ class Bot(Configurable):
             os.system('taskkill /f /im "MapleStory.exe"')
             os.system(f'taskkill /f /pid {os.getpid()}')
 
+    @staticmethod
+    def _click_rune_buff(top_band):
+        """
+        Right-clicks the leftmost rune buff icon in TOP_BAND, if there is one.
+        :param top_band:    The top rows of the game frame, where buff icons are shown.
+        :return:            Whether an icon was clicked.
+        """
+
+        rune_buff = utils.multi_match_pyramid(top_band, RUNE_BUFF_TEMPLATE, threshold=0.7)
+        if not rune_buff:
+            return False
+        rune_buff_pos = min(rune_buff, key=lambda p: p[0])
+        target = (
+            round(rune_buff_pos[0] + config.capture.window['left']),
+            round(rune_buff_pos[1] + config.capture.window['top'])
+        )
+        click(target, button='right')
+        return True
+
     def _get_next_failed_image_number(self):
         """
         Return the next sequential number for failed detection images.
-        Scans existing image_1.png, image_2.png, ... so numbering persists across restarts.
+        Scans existing image_1.png, image_2.png, ... once so numbering persists across restarts,
+        then counts up in-process.
         """
-        os.makedirs(FAILED_DETECTIONS_FOLDER, exist_ok=True)
-        max_num = 0
-        for name in os.listdir(FAILED_DETECTIONS_FOLDER):
-            m = re.match(r'image_(\d+)\.png', name, re.IGNORECASE)
-            if m:
-                max_num = max(max_num, int(m.group(1)))
-        return max_num + 1
+        if self.last_failed_num is None:
+            os.makedirs(FAILED_DETECTIONS_FOLDER, exist_ok=True)
+            max_num = 0
+            for name in os.listdir(FAILED_DETECTIONS_FOLDER):
+                lower = name.lower()
+                if lower.startswith('image_') and lower.endswith('.png'):
+                    digits = name[6:-4]
+                    if digits.isdecimal():
+                        max_num = max(max_num, int(digits))
+            self.last_failed_num = max_num
+        self.last_failed_num += 1
+        return self.last_failed_num
 
     def _save_failed_detection(self, frame, vertical_offset: int = 50):
         """Save a frame to failed_detections/image_N.png when rune detection fails. Crops to 640x640 like detection."""
@@ -212,9 +238,9 @@ class Bot(Configurable):
             next_num = self._get_next_failed_image_number()
             failed_image_path = os.path.join(FAILED_DETECTIONS_FOLDER, f'image_{next_num}.png')
             if frame.ndim == 3 and frame.shape[2] == 4:
-                rgb = frame[..., :3][..., ::-1].copy()
+                rgb = cv2.cvtColor(frame, cv2.COLOR_BGRA2RGB)
             else:
-                rgb = frame[..., ::-1].copy()
+                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
             img = Image.fromarray(rgb)
             img_cropped = crop_to_640x640(img, vertical_offset=vertical_offset)
             img_cropped.save(failed_image_path)
@@ -225,6 +251,9 @@ class Bot(Configurable):
     def load_commands(self, file):
         try:
             self.command_book = CommandBook(file)
+            self.move_command = self.command_book['move']
+            self.adjust_command = self.command_book['adjust']
+            self.wake_event.set()
             config.gui.settings.update_class_bindings()
         except ValueError:
             pass    # TODO: UI warning popup, say check cmd for errors
@@ -2,6 +2,7 @@
 
 import time
 import gc
+import queue
 import cv2
 import threading
 import ctypes
@@ -31,6 +32,12 @@ MM_BR_TEMPLATE = cv2.imread('assets/minimap_br_template.png', 0)
 MMT_HEIGHT = max(MM_TL_TEMPLATE.shape[0], MM_BR_TEMPLATE.shape[0])
 MMT_WIDTH = max(MM_TL_TEMPLATE.shape[1], MM_BR_TEMPLATE.shape[1])
 
+# Correlation each minimap corner must keep for a recalibration to reuse the previous corners
+CORNER_RECHECK_THRESHOLD = 0.95
+
+# The full window is only captured every this many minimap captures (~10 fps at ~60 fps)
+FULL_FRAME_INTERVAL = 6
+
 # The player's symbol on the minimap
 PLAYER_TEMPLATE = cv2.imread('assets/player_template.png', 0)
 PT_HEIGHT, PT_WIDTH = PLAYER_TEMPLATE.shape
@@ -49,10 +56,12 @@ class Capture:
         config.capture = self
 
         self.frame = None
+        self.frames = queue.Queue(maxsize=1)    # Latest full frame and its minimap, for Notifier
         self.minimap = {}
         self.minimap_ratio = 1
         self.minimap_sample = None
         self.sct = None
+        self._last_corners = None       # Window rectangle and minimap corners of the last calibration
         self.window = {
             'left': 0,
             'top': 0,
@@ -64,9 +73,6 @@ class Capture:
         self.calibrated = False
         self.thread = threading.Thread(target=self._main)
         self.thread.daemon = True
-        # Reuse a single buffer for screenshots to avoid allocating 4+ MiB every ~1 ms (ArrayMemoryError).
-        self._frame_buffer = None
-        self._gc_counter = 0  # Counter for periodic garbage collection
 
     def start(self):
         """Starts this Capture's thread."""
@@ -78,6 +84,9 @@ class Capture:
         """Constantly monitors the player's position and in-game events."""
 
         mss.windows.CAPTUREBLT = 0
+        # One mss instance (and its GDI device contexts) for the lifetime of this thread, which
+        # must also be the thread that grabs with it
+        self.sct = mss.mss()
         while True:
             # Calibrate screen capture
             handle = user32.FindWindowW(None, 'MapleStory')
@@ -92,15 +101,23 @@ class Capture:
             self.window['height'] = max(rect[3] - rect[1], MMT_HEIGHT)
 
             # Calibrate by finding the top-left and bottom-right corners of the minimap
-            with mss.mss() as self.sct:
-                self.frame = self.screenshot()
+            self.frame = self.screenshot()
             if self.frame is None:
                 continue
             # Search only in the top-left 30% of the frame (minimap is always there)
             h_frame, w_frame = self.frame.shape[:2]
             temp_frame = self.frame[0 : int(h_frame * 0.3), 0 : int(w_frame * 0.3)]
-            tl, _ = utils.single_match(temp_frame, MM_TL_TEMPLATE)
-            _, br = utils.single_match(temp_frame, MM_BR_TEMPLATE)
+            temp_gray = utils.prepare_frame(temp_frame)
+            window = tuple(self.window.values())
+            if self._last_corners is not None and self._last_corners[0] == window \
+                    and corners_match(temp_gray, *self._last_corners[1:]):
+                # The window has not moved and the minimap is still where it was (e.g. the bot was
+                # only paused), so there is no need to search for its corners again
+                tl, br = self._last_corners[1:]
+            else:
+                tl, _ = utils.single_match(temp_frame, MM_TL_TEMPLATE, gray=temp_gray)
+                _, br = utils.single_match(temp_frame, MM_BR_TEMPLATE, gray=temp_gray)
+                self._last_corners = (window, tl, br)
             mm_tl = (
                 tl[0] + MINIMAP_BOTTOM_BORDER,
                 tl[1] + MINIMAP_TOP_BORDER
@@ -113,66 +130,86 @@ class Capture:
             self.minimap_sample = self.frame[mm_tl[1]:mm_br[1], mm_tl[0]:mm_br[0]]
             self.calibrated = True
 
-            with mss.mss() as self.sct:
-                while True:
-                    if not self.calibrated:
-                        break
-
-                    # Take screenshot
-                    self.frame = self.screenshot()
-                    if self.frame is None:
-                        continue
-
-                    # Crop the frame to only show the minimap (copy so GUI thread
-                    # does not hold a reference to the full frame and cause memory pressure).
-                    minimap = self.frame[mm_tl[1]:mm_br[1], mm_tl[0]:mm_br[0]].copy()
-
-                    # Determine the player's position
-                    player = utils.multi_match(minimap, PLAYER_TEMPLATE, threshold=0.8)
-                    if player:
-                        config.player_pos = utils.convert_to_relative(player[0], minimap)
-
-                    # Package display information to be polled by GUI
-                    self.minimap = {
-                        'minimap': minimap,
-                        'rune_active': config.bot.rune_active,
-                        'rune_pos': config.bot.rune_pos,
-                        'path': config.path,
-                        'player_pos': config.player_pos
-                    }
-
-                    if not self.ready:
-                        self.ready = True
-                    
-                    # Periodic garbage collection every ~100 frames (~1.6s at 60fps) to help
-                    # free memory when system is under pressure (reduces "unable to alloc" errors).
-                    self._gc_counter += 1
-                    if self._gc_counter >= 100:
-                        gc.collect()
-                        self._gc_counter = 0
-                    
-                    # ~60 fps to reduce mss allocation pressure (grab allocates internally).
-                    time.sleep(0.016)
+            # Screen rectangle of the minimap, so it can be grabbed on its own
+            minimap_rect = {
+                'left': self.window['left'] + mm_tl[0],
+                'top': self.window['top'] + mm_tl[1],
+                'width': mm_br[0] - mm_tl[0],
+                'height': mm_br[1] - mm_tl[1]
+            }
+            frame_count = 0
+
+            while True:
+                if not self.calibrated:
+                    break
+
+                # Only the notifier and rune solver use the full window, so it is refreshed
+                # less often than the minimap, which tracks the player
+                frame = None
+                if frame_count % FULL_FRAME_INTERVAL == 0:
+                    frame = self.screenshot()
+                    if frame is not None:
+                        self.frame = frame
+                frame_count += 1
+
+                # Take a screenshot of only the minimap
+                minimap = self.screenshot(region=minimap_rect)
+                if minimap is None:
+                    continue
+                if frame is not None:
+                    self._publish(frame, minimap)
+
+                # Determine the player's position. The minimap is small enough that a full-resolution
+                # match beats a pyrDown coarse pass, which also misplaces the 5x5 downsampled symbol
+                player = utils.multi_match(minimap, PLAYER_TEMPLATE, threshold=0.8)
+                if player:
+                    config.player_pos = utils.convert_to_relative(player[0], minimap)
+
+                # Package display information to be polled by GUI
+                self.minimap = {
+                    'minimap': minimap,
+                    'rune_active': config.bot.rune_active,
+                    'rune_pos': config.bot.rune_pos,
+                    'path': config.path,
+                    'player_pos': config.player_pos
+                }
+
+                if not self.ready:
+                    self.ready = True
+
+                # ~60 fps to reduce mss allocation pressure (grab allocates internally).
+                time.sleep(0.016)
+
+    def _publish(self, frame, minimap):
+        """Hands FRAME and MINIMAP to the notifier, replacing any pair it has not taken yet."""
+
+        try:
+            self.frames.put_nowait((frame, minimap))
+        except queue.Full:
+            try:
+                self.frames.get_nowait()
+            except queue.Empty:
+                pass
+            self.frames.put_nowait((frame, minimap))
 
     def get_minimap_from_frame(self, frame):
         """
         Find the minimap by searching the entire frame for TL/BR corners (no ROI).
         Use this when the pre-cropped minimap might be wrong (e.g. for auto routine resolution).
-        Converts BGRA (mss) to BGR so matching matches test_minimap_finder / cv2.imread.
+        Matches on the grayscale frame, which is the same for BGRA (mss) and BGR input, so
+        matching matches test_minimap_finder / cv2.imread without a BGR copy of the frame.
         :param frame: Full game window image (e.g. self.frame), BGR or BGRA
-        :return: Minimap crop as numpy array, or None if not found
+        :return: Minimap crop as a BGR view into FRAME, or None if not found
         """
         if frame is None or frame.size == 0:
             return None
-        # Normalise to BGR so matching is same as test script (saved frame loaded as BGR)
-        if frame.ndim == 3 and frame.shape[2] == 4:
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
         h, w = frame.shape[:2]
         if (MM_TL_TEMPLATE.shape[0] > h or MM_TL_TEMPLATE.shape[1] > w or
                 MM_BR_TEMPLATE.shape[0] > h or MM_BR_TEMPLATE.shape[1] > w):
             return None
-        tl, _ = utils.single_match(frame, MM_TL_TEMPLATE)
-        _, br = utils.single_match(frame, MM_BR_TEMPLATE)
+        gray = utils.prepare_frame(frame)
+        tl, _ = utils.single_match(frame, MM_TL_TEMPLATE, gray=gray)
+        _, br = utils.single_match(frame, MM_BR_TEMPLATE, gray=gray)
         mm_tl = (
             tl[0] + MINIMAP_BOTTOM_BORDER,
             tl[1] + MINIMAP_TOP_BORDER
@@ -186,20 +223,16 @@ class Capture:
             return None
         if mm_tl[0] < 0 or mm_tl[1] < 0 or mm_br[0] > w or mm_br[1] > h:
             return None
-        return frame[mm_tl[1]:mm_br[1], mm_tl[0]:mm_br[0]]
+        return frame[mm_tl[1]:mm_br[1], mm_tl[0]:mm_br[0], :3]
 
-    def screenshot(self, delay=1):
+    def screenshot(self, delay=1, region=None):
         try:
-            shot = self.sct.grab(self.window)
-            h, w = shot.height, shot.width
-            need_shape = (h, w, 4)
-            if self._frame_buffer is None or self._frame_buffer.shape != need_shape:
-                self._frame_buffer = np.empty(need_shape, dtype=np.uint8)
-            np.copyto(
-                self._frame_buffer,
-                np.frombuffer(shot.raw, dtype=np.uint8).reshape(need_shape),
-            )
-            return self._frame_buffer
+            shot = self.sct.grab(self.window if region is None else region)
+            # View the BGRA pixels mss already copied into a fresh bytearray for this grab,
+            # rather than copying them again. Read-only, since other threads share the frame.
+            frame = np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+            frame.flags.writeable = False
+            return frame
         except MemoryError:
             # mss allocates a bytearray inside grab(); when system is low on memory
             # that can fail. Force GC and pause, then retry so the loop can continue.
@@ -211,3 +244,22 @@ class Capture:
             print(f'\n[!] Error while taking screenshot, retrying in {delay} second'
                   + ('s' if delay != 1 else ''))
             time.sleep(delay)
+
+
+def corners_match(gray, tl, br):
+    """
+    Checks whether the minimap corner templates are still at TL and BR in GRAY.
+    :param gray:    The grayscale region of the frame that contains the minimap.
+    :param tl:      The top-left position of the top-left corner template.
+    :param br:      The bottom-right position of the bottom-right corner template.
+    :return:        Whether both templates correlate with GRAY by at least CORNER_RECHECK_THRESHOLD.
+    """
+
+    br_h, br_w = MM_BR_TEMPLATE.shape
+    for template, (x, y) in ((MM_TL_TEMPLATE, tl), (MM_BR_TEMPLATE, (br[0] - br_w, br[1] - br_h))):
+        patch = gray[y:y + template.shape[0], x:x + template.shape[1]]
+        if x < 0 or y < 0 or patch.shape != template.shape:
+            return False
+        if cv2.matchTemplate(patch, template, cv2.TM_CCOEFF_NORMED)[0, 0] < CORNER_RECHECK_THRESHOLD:
+            return False
+    return True
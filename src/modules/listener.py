@@ -88,6 +88,7 @@ class Listener(Configurable):
         utils.print_state()
 
         if config.enabled:
+            config.bot.wake_event.set()
             winsound.Beep(784, 333)     # G5
         else:
             winsound.Beep(523, 333)     # C5
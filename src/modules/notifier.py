@@ -3,6 +3,7 @@
 from src.common import config, utils
 import time
 import os
+import queue
 import cv2
 import pygame
 import threading
@@ -56,6 +57,21 @@ SKULL_DEATH_SKULL_TEMPLATE = cv2.imread('assets/skull_death_skull.png', 0)
 # Lie detector
 LIE_DETECTOR_TEMPLATE = cv2.imread('assets/lie_detector.png', 0)
 
+# Only every this many pixels in each direction are sampled to detect a black screen
+BLACK_SCREEN_STRIDE = 4
+
+# How close to the black screen threshold a sample must be to check the full frame instead
+BLACK_SCREEN_MARGIN = 0.05
+
+# Event messages that are dismissed by pressing 'esc', checked in this order. Like the other
+# message templates, they are scored with TM_CCOEFF_NORMED so that 0.9 holds under any brightness
+DISMISSIBLE_MESSAGES = (
+    ('Pollo', POLLO_TEMPLATE),
+    ('Fritto', FRITTO_TEMPLATE),
+    ('Especia', ESPECIA_TEMPLATE),
+    ('Twentoona', TWENTOONA_TEMPLATE),
+)
+
 def get_alert_path(name):
     return os.path.join(Notifier.ALERTS_DIR, f'{name}.mp3')
 
@@ -88,90 +104,67 @@ class Notifier:
         rune_start_time = time.time()
         while True:
             if config.enabled:
-                frame = config.capture.frame
-                if frame is None:
-                    time.sleep(0.05)
+                # Wait for the next full frame, so no frame is checked twice
+                try:
+                    frame, minimap = config.capture.frames.get(timeout=0.1)
+                except queue.Empty:
                     continue
                 height, width, _ = frame.shape
-                minimap = config.capture.minimap['minimap']
 
                 # Check for unexpected black screen
-                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                if np.count_nonzero(gray < 15) / height / width > self.room_change_threshold:
+                if is_black_screen(frame, self.room_change_threshold):
                     time.sleep(40)
                     frame = config.capture.frame
                     height, width, _ = frame.shape
                     minimap = config.capture.minimap['minimap']
 
                     # Check for unexpected black screen
-                    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                    if np.count_nonzero(gray < 15) / height / width > self.room_change_threshold:
+                    if is_black_screen(frame, self.room_change_threshold):
                         self._alert('siren')
 
-                # Copy only the region we need for message/skull/elite checks so we can
-                # release the full frame before cv2.matchTemplate (reduces peak memory;
+                # Convert only the region searched by the message/skull/elite checks to grayscale,
+                # once, and reuse it for every template match. The conversion is a new array, so
+                # the full frame can be released before cv2.matchTemplate (reduces peak memory;
                 # avoids OpenCV "Insufficient memory" when many template matches run).
-                interrupting_message_frame = frame[height // 4:3 * height // 4, :].copy()
+                interrupting_message_gray = utils.prepare_frame(frame[height // 4:3 * height // 4])
                 del frame  # Release full-frame reference before allocating in multi_match
-                del gray
-
-                # Convert to grayscale ONCE and reuse for all template matches to avoid
-                # allocating a new grayscale array for each multi_match call.
-                interrupting_message_gray = cv2.cvtColor(interrupting_message_frame, cv2.COLOR_BGR2GRAY)
-                del interrupting_message_frame  # Release color frame; we only need grayscale now
-
-                # Check for Pollo Message
-                pollo = utils.multi_match_gray(interrupting_message_gray, POLLO_TEMPLATE, threshold=0.9)
-                if len(pollo) > 0:
-                    print("Pollo Message Detected")
-                    print(pollo)
-                    press("esc", 1, down_time=0.1)
-
-                # Check for Fritto Message
-                fritto = utils.multi_match_gray(interrupting_message_gray, FRITTO_TEMPLATE, threshold=0.9)
-                if len(fritto) > 0:
-                    print("Fritto Message Detected")
-                    print(fritto)
-                    press("esc", 1, down_time=0.1)
-
-                # Check for Especia Message
-                especia = utils.multi_match_gray(interrupting_message_gray, ESPECIA_TEMPLATE, threshold=0.9)
-                if len(especia) > 0:
-                    print("Especia Message Detected")
-                    print(especia)
-                    press("esc", 1, down_time=0.1)
-
-                # Check for Twentoona Message
-                twentoona = utils.multi_match_gray(interrupting_message_gray, TWENTOONA_TEMPLATE, threshold=0.9)
-                if len(twentoona) > 0:
-                    print("Twentoona Message Detected")
-                    print(twentoona)
-                    press("esc", 1, down_time=0.1)
+
+                # Check for the Pollo, Fritto, Especia and Twentoona messages, reusing the same
+                # grayscale ROI (and its GPU upload, if any) for every template
+                for name, template in DISMISSIBLE_MESSAGES:
+                    score, pos = utils.single_match_score(interrupting_message_gray, template, threshold=0.9)
+                    if score >= 0.9:
+                        print(f"{name} Message Detected")
+                        print(pos)
+                        press("esc", 1, down_time=0.1)
 
                 # Check for Lie Detector
                 if LIE_DETECTOR_TEMPLATE is not None:
-                    lie_detector = utils.multi_match_gray(interrupting_message_gray, LIE_DETECTOR_TEMPLATE, threshold=0.9)
-                    if len(lie_detector) > 0:
+                    score, _ = utils.single_match_score(interrupting_message_gray, LIE_DETECTOR_TEMPLATE, threshold=0.9)
+                    if score >= 0.9:
                         print("Lie Detector detected")
                         os.system('taskkill /f /im "MapleStory.exe"')
                         os.system(f'taskkill /f /pid {os.getpid()}')
 
                 # Check for Skull Death
-                skull_death_left_arrow = utils.multi_match_gray(interrupting_message_gray, SKULL_DEATH_LEFT_ARROW_TEMPLATE, threshold=0.9)
-                skull_death_right_arrow = utils.multi_match_gray(interrupting_message_gray, SKULL_DEATH_RIGHT_ARROW_TEMPLATE, threshold=0.9)
-                skull_death_hp_bar = utils.multi_match_gray(interrupting_message_gray, SKULL_DEATH_HP_BAR_TEMPLATE, threshold=0.9)
-                skull_death_skull = utils.multi_match_gray(interrupting_message_gray, SKULL_DEATH_SKULL_TEMPLATE, threshold=0.9)
-                if len(skull_death_left_arrow) > 0 or len(skull_death_right_arrow) > 0 or len(skull_death_hp_bar) > 0 or len(skull_death_skull) > 0:
+                skull_death = {
+                    part: utils.single_match_score(interrupting_message_gray, template, threshold=0.9)
+                    for part, template in (('left arrow', SKULL_DEATH_LEFT_ARROW_TEMPLATE),
+                                           ('right arrow', SKULL_DEATH_RIGHT_ARROW_TEMPLATE),
+                                           ('hp bar', SKULL_DEATH_HP_BAR_TEMPLATE),
+                                           ('skull', SKULL_DEATH_SKULL_TEMPLATE))
+                }
+                if any(score >= 0.9 for score, _ in skull_death.values()):
                     print("Skull Death Detected")
-                    print(f"Detection: left arrow {skull_death_left_arrow}, right arrow {skull_death_right_arrow}, hp bar {skull_death_hp_bar}, skull {skull_death_skull}")
+                    print(f"Detection (score, position): {skull_death}")
                     for _ in range(20):
                         press("left", 1, down_time=0.1)
                         press("right", 1, down_time=0.1)
                     print("Skull Death Avoided")
 
                 # Check for elite warning: wait 7s, use Origin, wait 5s, use Ascent (6th job; not in skill rotation)
-                elite = utils.multi_match_gray(interrupting_message_gray, ELITE_TEMPLATE, threshold=0.9)
-                if len(elite) > 0:
+                score, _ = utils.single_match_score(interrupting_message_gray, ELITE_TEMPLATE, threshold=0.9)
+                if score >= 0.9:
                     print("Elite Boss Detected - using Origin then Ascent.")
                     module = getattr(config.bot.command_book, 'module', None) if getattr(config.bot, 'command_book', None) else None
                     if module and hasattr(module, 'Key'):
@@ -189,7 +182,7 @@ class Notifier:
 
                 # Check for other players entering the map
                 filtered = utils.filter_color(minimap, OTHER_RANGES)
-                others = len(utils.multi_match(filtered, OTHER_TEMPLATE, threshold=0.5))
+                others = len(utils.multi_match(filtered, OTHER_TEMPLATE, threshold=0.5, peaks_only=True))
                 config.stage_fright = others > 0
                 if others != prev_others:
                     if others > prev_others:
@@ -205,15 +198,16 @@ class Notifier:
                     if matches and config.routine.sequence:
                         abs_rune_pos = (matches[0][0], matches[0][1])
                         config.bot.rune_pos = utils.convert_to_relative(abs_rune_pos, minimap)
-                        distances = list(map(distance_to_rune, config.routine.sequence))
-                        index = np.argmin(distances)
+                        sequence = config.routine.sequence
+                        index = min(range(len(sequence)), key=lambda i: distance_to_rune(sequence[i]))
                         config.bot.rune_closest_pos = config.routine[index].location
                         config.bot.rune_active = True
                         self._ping('rune_appeared', volume=0.75)
                 # elif now - rune_start_time > self.rune_alert_delay:     # Alert if rune hasn't been solved
                 #     config.bot.rune_active = False
                 #     self._alert('siren')
-            time.sleep(0.05)
+            else:
+                time.sleep(0.05)
 
     def _alert(self, name, volume=0.75):
         """
@@ -243,6 +237,30 @@ class Notifier:
 #################################
 #       Helper Functions        #
 #################################
+def is_black_screen(frame, threshold):
+    """
+    Checks whether more than THRESHOLD of FRAME is black. Only every BLACK_SCREEN_STRIDE-th
+    pixel in each direction is converted and counted, unless that sample lands within
+    BLACK_SCREEN_MARGIN of THRESHOLD, in which case the whole frame decides.
+    :param frame:       The game window image.
+    :param threshold:   The fraction of pixels that must be black.
+    :return:            Whether FRAME is a black screen.
+    """
+
+    if frame.ndim == 3 and frame.shape[2] == 4:
+        # Gathering each BGRA pixel as one uint32 is several times faster than channel by channel
+        pixels = frame.view(np.uint32)[::BLACK_SCREEN_STRIDE, ::BLACK_SCREEN_STRIDE]
+        sample = np.ascontiguousarray(pixels).view(np.uint8)
+    else:
+        sample = np.ascontiguousarray(frame[::BLACK_SCREEN_STRIDE, ::BLACK_SCREEN_STRIDE])
+    sample = utils.prepare_frame(sample)
+    if utils.mostly_dark(sample, threshold + BLACK_SCREEN_MARGIN):
+        return True
+    if not utils.mostly_dark(sample, threshold - BLACK_SCREEN_MARGIN):
+        return False
+    return utils.mostly_dark(utils.prepare_frame(frame), threshold)
+
+
 def distance_to_rune(point):
     """
     Calculates the distance from POINT to the rune.
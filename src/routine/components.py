@@ -1,8 +1,10 @@
 """A collection of classes used to execute a Routine."""
 
 import math
+import operator
 import random
 import time
+from types import MappingProxyType
 from src.common import config, settings, utils
 from src.common.vkeys import key_down, key_up, press
 
@@ -12,7 +14,7 @@ from src.common.vkeys import key_down, key_up, press
 #################################
 class Component:
     id = 'Routine Component'
-    PRIMITIVES = {int, str, bool, float}
+    PRIMITIVES = (int, str, bool, float)
 
     def __init__(self, *args, **kwargs):
         if len(args) > 1:
@@ -27,6 +29,9 @@ class Component:
             self.kwargs = args[0].copy()
             self.kwargs.pop('__class__')
             self.kwargs.pop('self')
+        # The arguments are only ever replaced through __init__, so encode them once
+        self._encoded_args = [f'{key}={value}' for key, value in self.kwargs.items()
+                              if key != 'id' and isinstance(value, Component.PRIMITIVES)]
 
     @utils.run_if_enabled
     def execute(self):
@@ -42,21 +47,20 @@ class Component:
         self.__init__(*args, **kwargs)
 
     def info(self):
-        """Returns a dictionary of useful information about this Component."""
+        """
+        Returns a dictionary of useful information about this Component. Its 'vars' entry is
+        a read-only view of this Component's arguments; copy it before modifying it.
+        """
 
         return {
             'name': self.__class__.__name__,
-            'vars': self.kwargs.copy()
+            'vars': MappingProxyType(self.kwargs)
         }
 
     def encode(self):
         """Encodes an object using its ID and its __init__ arguments."""
 
-        arr = [self.id]
-        for key, value in self.kwargs.items():
-            if key != 'id' and type(self.kwargs[key]) in Component.PRIMITIVES:
-                arr.append(f'{key}={value}')
-        return ', '.join(arr)
+        return ', '.join([self.id, *self._encoded_args])
 
 
 class Point(Component):
@@ -79,11 +83,9 @@ class Point(Component):
         """Executes the set of actions associated with this Point."""
 
         if self.counter == 0:
-            move = config.bot.command_book['move']
-            move(*self.location).execute()
+            config.bot.move_command(*self.location).execute()
             if self.adjust:
-                adjust = config.bot.command_book['adjust']      # TODO: adjust using step('up')?
-                adjust(*self.location).execute()
+                config.bot.adjust_command(*self.location).execute()     # TODO: adjust using step('up')?
             if settings.skill_rotation_mode:
                 SkillRotation(duration=settings.skill_rotation_duration).execute()
             else:
@@ -99,6 +101,7 @@ class Point(Component):
 
     def info(self):
         curr = super().info()
+        curr['vars'] = dict(curr['vars'])
         curr['vars'].pop('location', None)
         curr['vars']['commands'] = ', '.join([c.id for c in self.commands])
         return curr
@@ -126,6 +129,7 @@ class Label(Component):
 
     def info(self):
         curr = super().info()
+        curr['vars'] = dict(curr['vars'])
         curr['vars']['index'] = self.index
         return curr
 
@@ -168,11 +172,12 @@ class Jump(Component):
         :return:    Whether the binding was successful
         """
 
-        if self.label in config.routine.labels:
-            self.link = config.routine.labels[self.label]
-            self.link.links.add(self)
-            return True
-        return False
+        link = config.routine.labels.get(self.label)
+        if link is None:
+            return False
+        self.link = link
+        link.links.add(self)
+        return True
 
     def __delete__(self, instance):
         if self.link is not None:
@@ -220,46 +225,72 @@ class Command(Component):
         self.id = self.__class__.__name__
 
     def __str__(self):
-        variables = self.__dict__
+        variables = {key: value for key, value in self.__dict__.items()
+                     if key != 'id' and not key.startswith('_')}     # Skip internal caches
         result = '    ' + self.id
-        if len(variables) - 1 > 0:
+        if variables:
             result += ':'
         for key, value in variables.items():
-            if key != 'id':
-                result += f'\n        {key}={value}'
+            result += f'\n        {key}={value}'
         return result
 
 
-def _try_skill_during_move():
+def _skill_context():
     """
-    If the current command book has SKILL_COOLDOWNS, use one random off-cooldown skill.
-    Uses the same CooldownTracker as SkillRotation so cooldowns stay in sync.
+    Returns the current command book's module, its SKILL_COOLDOWNS (None if it has none) and
+    its SKILL_PRESS_COUNTS (empty if it has none). They are resolved once per command book and
+    cached on config.bot.
     """
+    bot = config.bot
+    command_book = getattr(bot, 'command_book', None)
+    context = getattr(bot, '_skill_context', None)
+    if context is None or context[0] is not command_book:
+        module = getattr(command_book, 'module', None) if command_book else None
+        cooldowns = getattr(module, 'SKILL_COOLDOWNS', None) if module else None
+        press_counts = (getattr(module, 'SKILL_PRESS_COUNTS', None) or {}) if module else {}
+        context = (command_book, module, cooldowns, press_counts)
+        bot._skill_context = context
+    return context[1:]
+
+
+def _cooldown_tracker(cooldowns):
+    """Returns the CooldownTracker shared through config.bot, replacing it if COOLDOWNS changed."""
     from src.routine.cooldown_tracker import CooldownTracker
-    module = getattr(config.bot.command_book, 'module', None) if getattr(config.bot, 'command_book', None) else None
-    cooldowns = getattr(module, 'SKILL_COOLDOWNS', None) if module else None
-    if cooldowns is None:
-        return
     tracker = getattr(config.bot, 'cooldown_tracker', None)
     if tracker is None or getattr(tracker, '_cooldowns_ref', None) is not cooldowns:
         tracker = CooldownTracker(cooldowns)
         tracker._cooldowns_ref = cooldowns
         setattr(config.bot, 'cooldown_tracker', tracker)
-    skill_ids = [k for k, cd in cooldowns.items() if cd > 0]
-    available = [k for k in tracker.get_available() if k in skill_ids]
-    if not available:
+    return tracker
+
+
+def _try_skill_during_move():
+    """
+    If the current command book has SKILL_COOLDOWNS, use one random off-cooldown skill.
+    Uses the same CooldownTracker as SkillRotation so cooldowns stay in sync.
+    """
+    module, cooldowns, skill_press_counts = _skill_context()
+    if cooldowns is None:
+        return
+    tracker = _cooldown_tracker(cooldowns)
+    skill_id = tracker.pick_random_available_in(tracker.rotation_ids)
+    if skill_id is None:
         return
-    skill_id = random.choice(available)
-    press_count = 1
-    if module is not None:
-        skill_press_counts = getattr(module, 'SKILL_PRESS_COUNTS', None) or {}
-        press_count = skill_press_counts.get(skill_id, 1)
+    press_count = skill_press_counts.get(skill_id, 1)
     actual_key = _resolve_key(module, skill_id)
     press(actual_key, press_count, down_time=0.05, up_time=0.05)
     tracker.record_used(skill_id)
     time.sleep(0.05)
 
 
+# Each axis gets this share of the move tolerance, so that both together stay within it
+INV_SQRT2 = 1 / math.sqrt(2)
+
+# Direction keys for a positive and a negative offset, indexed by whether the offset is negative
+HORIZONTAL_KEYS = ('right', 'left')
+VERTICAL_KEYS = ('down', 'up')
+
+
 class Move(Command):
     """Moves to a given position using the shortest path based on the current Layout."""
 
@@ -277,33 +308,37 @@ class Move(Command):
 
     def main(self):
         counter = self.max_steps
+        # Settings only change between commands, so they are read once per move
+        tolerance = settings.move_tolerance
+        axis_tolerance = tolerance * INV_SQRT2
+        record_layout = settings.record_layout
+        distance = utils.distance
+        # The command book's jump key, used for the occasional jump while moving horizontally
+        key_class = getattr(_skill_context()[0], 'Key', None)
+        jump_key = getattr(key_class, 'JUMP', 'space') if key_class else 'space'
+        # Reads config.enabled and config.player_pos together, in one call
+        state = operator.attrgetter('enabled', 'player_pos')
         path = config.layout.shortest_path(config.player_pos, self.target)
         for i, point in enumerate(path):
             toggle = True
             self.prev_direction = ''
-            local_error = utils.distance(config.player_pos, point)
-            global_error = utils.distance(config.player_pos, self.target)
-            while config.enabled and counter > 0 and \
-                    local_error > settings.move_tolerance and \
-                    global_error > settings.move_tolerance:
+            enabled, pos = state(config)
+            local_error = distance(pos, point)
+            global_error = distance(pos, self.target)
+            while enabled and counter > 0 and \
+                    local_error > tolerance and \
+                    global_error > tolerance:
                 if toggle:
                     d_x = point[0] - config.player_pos[0]
-                    if abs(d_x) > settings.move_tolerance / math.sqrt(2):
-                        if d_x < 0:
-                            key = 'left'
-                        else:
-                            key = 'right'
+                    if abs(d_x) > axis_tolerance:
+                        key = HORIZONTAL_KEYS[d_x < 0]
                         self._new_direction(key)
                         # Occasional jump during horizontal movement to avoid getting stuck on ladders
                         if random.random() < 0.3:
-                            jump_key = getattr(
-                                getattr(getattr(config.bot, 'command_book', None), 'module', None), 'Key', None
-                            )
-                            jump_key = getattr(jump_key, 'JUMP', 'space') if jump_key else 'space'
                             press(jump_key, 1, down_time=0.05, up_time=0.05)
                             time.sleep(utils.rand_float(0.05, 0.12))
                         step(key, point)
-                        if settings.record_layout:
+                        if record_layout:
                             config.layout.add(*config.player_pos)
                         counter -= 1
                         _try_skill_during_move()
@@ -311,11 +346,8 @@ class Move(Command):
                             time.sleep(0.15)
                 else:
                     d_y = point[1] - config.player_pos[1]
-                    if abs(d_y) > settings.move_tolerance / math.sqrt(2):
-                        if d_y < 0:
-                            key = 'up'
-                        else:
-                            key = 'down'
+                    if abs(d_y) > axis_tolerance:
+                        key = VERTICAL_KEYS[d_y < 0]
                         # Never hold 'up' - step uses rope lift only, no up+jump
                         if key == 'up':
                             if self.prev_direction:
@@ -324,14 +356,15 @@ class Move(Command):
                         else:
                             self._new_direction(key)
                         step(key, point)
-                        if settings.record_layout:
+                        if record_layout:
                             config.layout.add(*config.player_pos)
                         counter -= 1
                         _try_skill_during_move()
                         if i < len(path) - 1:
                             time.sleep(0.05)
-                local_error = utils.distance(config.player_pos, point)
-                global_error = utils.distance(config.player_pos, self.target)
+                enabled, pos = state(config)
+                local_error = distance(pos, point)
+                global_error = distance(pos, self.target)
                 toggle = not toggle
             if self.prev_direction:
                 key_up(self.prev_direction)
@@ -415,13 +448,30 @@ SKILL_ROTATION_MAIN_ATTACK_KEY = 'ctrl'
 SKILL_ROTATION_JUMP_KEY = 'space'
 
 
+# Physical keys already resolved by _resolve_key, keyed by (command book module, skill ID).
+# Cleared by clear_resolved_keys whenever a command book's key bindings change.
+_resolved_keys = {}
+
+
 def _resolve_key(module, skill_id: str) -> str:
     """Resolve skill ID to physical key. Supports rebinds via Key class.
     If skill_id is a Key attribute (e.g. STRIKE), returns Key.STRIKE (user's binding).
     Otherwise returns skill_id as literal key (backwards compat for key-based cooldowns)."""
-    if module is None or not hasattr(module, 'Key'):
-        return skill_id
-    return getattr(module.Key, skill_id, skill_id)
+    cache_key = (module, skill_id)
+    key = _resolved_keys.get(cache_key)
+    if key is None:
+        if module is None or not hasattr(module, 'Key'):
+            key = skill_id
+        else:
+            key = getattr(module.Key, skill_id, skill_id)
+        _resolved_keys[cache_key] = key
+    return key
+
+
+def clear_resolved_keys():
+    """Forgets the keys resolved by _resolve_key, so rebinds made to a Key class take effect."""
+
+    _resolved_keys.clear()
 
 
 class SkillRotation(Command):
@@ -451,47 +501,38 @@ class SkillRotation(Command):
         direction = random.choice(('left', 'right'))
         key_down(direction)
         key_down(main_key)
-        end_hold = time.time() + duration
-        while config.enabled and time.time() < end_hold:
+        end_hold = time.monotonic() + duration
+        while config.enabled and time.monotonic() < end_hold:
             time.sleep(0.05)
         key_up(main_key)
         key_up(direction)
         time.sleep(0.03)
 
     def main(self):
-        from src.routine.cooldown_tracker import CooldownTracker
-        module = getattr(config.bot.command_book, 'module', None) if getattr(config.bot, 'command_book', None) else None
-        cooldowns = getattr(module, 'SKILL_COOLDOWNS', None) if module else None
+        module, cooldowns, skill_press_counts = _skill_context()
         if cooldowns is None:
             cooldowns = {}
-        tracker = getattr(config.bot, 'cooldown_tracker', None)
-        if tracker is None or getattr(tracker, '_cooldowns_ref', None) is not cooldowns:
-            tracker = CooldownTracker(cooldowns)
-            tracker._cooldowns_ref = cooldowns
-            setattr(config.bot, 'cooldown_tracker', tracker)
+        tracker = _cooldown_tracker(cooldowns)
         # Main attack = first skill with 0 cd (or fallback)
-        main_attack_id = next((k for k, cd in cooldowns.items() if cd == 0), None)
+        main_attack_id = tracker.main_attack_id
         main_key = _resolve_key(module, main_attack_id) if main_attack_id else SKILL_ROTATION_MAIN_ATTACK_KEY
         # Skills with cd > 0 for rotation
-        skill_ids = [k for k, cd in cooldowns.items() if cd > 0]
-        end = time.time() + self.duration
-        while config.enabled and time.time() < end:
-            remaining = end - time.time()
+        skill_ids = tracker.rotation_ids
+        end = time.monotonic() + self.duration
+        while config.enabled and time.monotonic() < end:
+            remaining = end - time.monotonic()
             self._main_attack_phase(main_key, max_sec=min(5.0, max(0.2, remaining)))
-            if not config.enabled or time.time() >= end:
+            if not config.enabled or time.monotonic() >= end:
                 break
-            available = [k for k in tracker.get_available() if k in skill_ids]
-            while config.enabled and time.time() < end and not available:
-                self._main_attack_phase(main_key, max_sec=0.3)
-                available = [k for k in tracker.get_available() if k in skill_ids]
-            if not config.enabled or time.time() >= end:
+            while config.enabled and time.monotonic() < end and not tracker.any_available(skill_ids):
+                # Keep attacking until the next skill is ready (or the rotation ends)
+                wait = min(end, tracker.next_ready_time(skill_ids)) - time.monotonic()
+                self._main_attack_phase(main_key, max_sec=max(0.2, wait))
+            if not config.enabled or time.monotonic() >= end:
                 break
-            if available:
-                skill_id = random.choice(available)
-                press_count = 1
-                if module is not None:
-                    skill_press_counts = getattr(module, 'SKILL_PRESS_COUNTS', None) or {}
-                    press_count = skill_press_counts.get(skill_id, 1)
+            skill_id = tracker.pick_random_available_in(skill_ids)
+            if skill_id is not None:
+                press_count = skill_press_counts.get(skill_id, 1)
                 actual_key = _resolve_key(module, skill_id)
                 press(actual_key, press_count, down_time=0.05, up_time=0.05)
                 tracker.record_used(skill_id)
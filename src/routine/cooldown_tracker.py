@@ -2,6 +2,7 @@
 Tracks last-used time per skill and returns which skills are off cooldown.
 Used for "pick a random available skill" rotation at each waypoint.
 """
+import sys
 import time
 import random
 from typing import Optional
@@ -13,24 +14,76 @@ class CooldownTracker:
     """
 
     def __init__(self, cooldowns: dict[str, float]):
-        self.cooldowns = dict(cooldowns)
-        self.last_used: dict[str, float] = {k: 0.0 for k in self.cooldowns}
+        # Plain dicts: for a command book's handful of skills, scanning them is faster than
+        # NumPy arrays (per-call overhead) or parallel lists zipped together. Keys are interned
+        # so that dict and set lookups succeed on identity without comparing strings.
+        self.cooldowns = {sys.intern(k): v for k, v in cooldowns.items()}
+        # time.monotonic() of each skill's last use (-inf if never used, so it starts off cooldown)
+        self.last_used: dict[str, float] = {k: float('-inf') for k in self.cooldowns}
+        # Main attack = first skill with 0 cd; the skills with cd > 0 are the rotation
+        self.main_attack_id: Optional[str] = next((k for k, cd in self.cooldowns.items() if cd == 0), None)
+        self.rotation_ids: frozenset[str] = frozenset(k for k, cd in self.cooldowns.items() if cd > 0)
+        # Without any positive cooldown (e.g. a main-attack-only book) every skill is always ready
+        self._all_ready = not self.rotation_ids
+        self._keys_tuple = tuple(self.cooldowns)
 
     def record_used(self, key: str) -> None:
-        self.last_used[key] = time.time()
+        self.last_used[key] = time.monotonic()
 
     def get_available(self) -> list[str]:
         """Return list of skill keys that are off cooldown."""
-        now = time.time()
+        if self._all_ready:
+            return list(self._keys_tuple)
+        now = time.monotonic()
+        last_used = self.last_used
         out = []
+        append = out.append
         for key, cd in self.cooldowns.items():
-            if cd <= 0 or (now - self.last_used[key]) >= cd:
-                out.append(key)
+            if cd <= 0 or (now - last_used[key]) >= cd:
+                append(key)
         return out
 
+    def pick_random_available_in(self, allowed) -> Optional[str]:
+        """
+        Return one random skill key in allowed that is off cooldown, or None if none available.
+        Counts the candidates, then walks to the chosen one, so no list of them is built; the
+        pick is the same as random.choice over the available keys of allowed, in cooldowns order.
+        """
+        now = time.monotonic()
+        last_used = self.last_used
+        count = 0
+        for key, cd in self.cooldowns.items():
+            if key in allowed and (cd <= 0 or (now - last_used[key]) >= cd):
+                count += 1
+        if not count:
+            return None
+        index = random.randrange(count)
+        for key, cd in self.cooldowns.items():
+            if key in allowed and (cd <= 0 or (now - last_used[key]) >= cd):
+                if not index:
+                    return key
+                index -= 1
+
+    def any_available(self, keys) -> bool:
+        """Return whether any of keys is off cooldown, without building the list of them."""
+        now = time.monotonic()
+        cooldowns = self.cooldowns
+        last_used = self.last_used
+        for key in keys:
+            cd = cooldowns[key]
+            if cd <= 0 or (now - last_used[key]) >= cd:
+                return True
+        return False
+
+    def next_ready_time(self, keys) -> float:
+        """Return the time.monotonic() at which the first of keys comes off cooldown (inf if none)."""
+        cooldowns = self.cooldowns
+        last_used = self.last_used
+        return min((last_used[key] + cooldowns[key] for key in keys if cooldowns[key] > 0),
+                   default=float('inf'))
+
     def pick_random_available(self) -> Optional[str]:
         """Return one random skill key that is off cooldown, or None if none available."""
-        available = self.get_available()
-        if not available:
-            return None
-        return random.choice(available)
+        if self._all_ready:
+            return random.choice(self._keys_tuple) if self._keys_tuple else None
+        return self.pick_random_available_in(self.cooldowns.keys())